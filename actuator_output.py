@@ -0,0 +1,159 @@
+import threading
+import time
+
+from pymavlink import mavutil
+
+# Desired PWM for every RC channel, sent as one RC_CHANNELS_OVERRIDE per update.
+#   out = ActuatorOutput(hub).start()
+#   out.set({1: 1100, 3: 1500})   # returns at once; the sender thread transmits
+#   out.set({1: 1500, 3: 1500}, immediate=True)   # queued for sending now, never coalesced
+#   out.release()                 # hand the channels back to the RC transmitter
+#   out.close()                   # sends what is still pending, releases, flushes the link
+#
+# Only changes are sent, plus a keep-alive while any channel is overridden
+# (ArduPilot drops overrides after RC_OVERRIDE_TIME, 3 s by default). Updates
+# that arrive faster than max_rate, or while the hub still has unsent
+# messages, are coalesced: the next message carries only the latest values.
+#
+# Note the autopilot treats these as pilot stick input (RC1 steering, RC3
+# throttle on ArduRover), so they take effect in modes that read the sticks.
+
+IGNORE = 65535  # UINT16_MAX: leave this channel alone
+
+
+def _release_value(channel):
+    # 0 releases channels 1-8; channels 9-18 use UINT16_MAX - 1 (0 means ignore there).
+    return 0 if channel <= 8 else 65534
+
+
+class ActuatorOutput:
+    def __init__(self, hub, keepalive=0.5, max_rate=20.0):
+        self.hub = hub
+        self.keepalive = keepalive
+        self.min_interval = 1.0 / max_rate
+
+        # MAVLink 1 only carries channels 1-8; MAVLink 2 extends the message to 18.
+        self.channels = 18 if mavutil.mavlink.WIRE_PROTOCOL_VERSION == "2.0" else 8
+        self._values = [IGNORE] * self.channels  # what should be on the wire
+        self._sent = None  # last values actually sent
+        self._last_send = 0.0
+        self._dirty = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self.updates = 0
+        self.unchanged = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.keepalives = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="actuator-output", daemon=True)
+        self._thread.start()
+        return self
+
+    def set(self, channels, immediate=False):
+        # channels: {channel number (1-based): pwm}. Never blocks on the link.
+        # immediate=True hands the message to the hub right away, skipping the
+        # rate limit and the backlog wait, so it cannot be merged with later updates.
+        with self._cond:
+            self.updates += 1
+            values = list(self._values)
+            for channel, pwm in channels.items():
+                values[channel - 1] = int(pwm)
+            if immediate:
+                self._values = values
+                self._transmit(values)
+                self._sent = list(values)
+                self._dirty = False
+                self._cond.notify()
+                return True
+            if values == self._values:
+                self.unchanged += 1
+                return False
+            if self._dirty:
+                self.coalesced += 1  # the previous update never made it out
+            self._values = values
+            self._dirty = True
+            self._cond.notify()
+            return True
+
+    def get(self, channel):
+        value = self._values[channel - 1]
+        return None if value == IGNORE else value
+
+    def release(self, channels=None):
+        # Sends the release once, then stops overriding those channels.
+        with self._cond:
+            channels = channels or [i + 1 for i, v in enumerate(self._values) if v != IGNORE]
+            values = list(self._values)
+            for channel in channels:
+                values[channel - 1] = _release_value(channel)
+            self._transmit(values)
+            for channel in channels:
+                self._values[channel - 1] = IGNORE
+            self._sent = list(self._values)
+            self._dirty = False
+
+    def _active(self):
+        return any(v != IGNORE for v in self._values)
+
+    def _transmit(self, values):
+        self.hub.send(self.hub.mav.rc_channels_override_encode(
+            self.hub.master.target_system, self.hub.master.target_component, *values))
+        self._last_send = time.monotonic()
+        self.sent += 1
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                since = now - self._last_send
+                keepalive_due = self._active() and since >= self.keepalive
+                if self._dirty and self._values == self._sent and not keepalive_due:
+                    self._dirty = False  # changed and changed back before it was sent
+
+                if (self._dirty or keepalive_due) and since >= self.min_interval and not self.hub.backlog():
+                    if not self._dirty:
+                        self.keepalives += 1
+                    self._transmit(self._values)
+                    self._sent = list(self._values)
+                    self._dirty = False
+                    continue
+
+                waits = []
+                if self._dirty:
+                    # Rate limit, or poll briefly while the link drains its queue.
+                    waits.append(max(self.min_interval - since, 0.002))
+                if self._active():
+                    waits.append(max(self.keepalive - since, 0.002))
+                self._cond.wait(min(waits) if waits else None)
+
+    def stats(self):
+        return {
+            "updates": self.updates,
+            "unchanged": self.unchanged,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "keepalives": self.keepalives,
+            "channels": {i + 1: v for i, v in enumerate(self._values) if v != IGNORE},
+        }
+
+    def close(self, release=True, timeout=1.0):
+        # Stops the sender thread, then sends the final values (and the release)
+        # from this thread and waits for the hub to write them, so the last
+        # command reaches the vehicle even if the process exits right after.
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        with self._cond:
+            if self._dirty and self._values != self._sent:
+                self._transmit(self._values)
+                self._sent = list(self._values)
+            self._dirty = False
+        if release and self._active():
+            self.release()
+        self.hub.flush(timeout)
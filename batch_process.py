@@ -0,0 +1,151 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2 as cv
+import numpy as np
+
+from vision import visionNav, decide, DECISIONS, SMOOTHING_MODES, CLASSIFIERS
+
+# Headless post-mission processing. Each video becomes <name>_detections.npz
+# with one row per frame:
+#   frame, pos_ms, red_box, green_box (x, y, w, h; -1 when missing),
+#   middle_x, offset, distance (NaN when not lined up), decision (index into DECISIONS)
+#
+#   python batch_process.py recordings/*.mp4 --workers 4
+#   python batch_process.py run.mp4 --annotate            (also writes an annotated mp4)
+#
+#   data = np.load("run_detections.npz"); data["decision"], data["red_box"][:, 0] ...
+
+DECISION_CODES = {name: code for code, name in enumerate(DECISIONS)}
+
+
+def frame_count(video_path):
+    video = cv.VideoCapture(video_path)
+    if not video.isOpened():
+        raise IOError(f"Could not open {video_path}")
+    count = int(video.get(cv.CAP_PROP_FRAME_COUNT))
+    video.release()
+    return count
+
+
+def split_ranges(count, parts):
+    parts = max(1, min(parts, count)) if count > 0 else 1
+    bounds = np.linspace(0, count, parts + 1, dtype=int)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(parts)]
+
+
+def _box(buoy):
+    return (buoy.x, buoy.y, buoy.w, buoy.h) if buoy is not None else (-1, -1, -1, -1)
+
+
+def process_range(video_path, start, end, nav_kwargs, annotate_path=None):
+    # end=None runs to the end of the file (used when the frame count is unknown).
+    nav = visionNav(draw=annotate_path is not None, **nav_kwargs)
+    video = cv.VideoCapture(video_path)
+    if start:
+        video.set(cv.CAP_PROP_POS_FRAMES, start)
+
+    out = None
+    columns = {"frame": [], "pos_ms": [], "red_box": [], "green_box": [],
+               "middle_x": [], "offset": [], "distance": [], "decision": []}
+    index = start
+    try:
+        while end is None or index < end:
+            ret, frame = video.read()
+            if not ret:
+                break
+            pos_ms = video.get(cv.CAP_PROP_POS_MSEC)
+            nav.image = frame
+            nav.generate_masks()
+            detection = nav.detect_buoys()
+
+            columns["frame"].append(index)
+            columns["pos_ms"].append(pos_ms)
+            columns["red_box"].append(_box(detection.red))
+            columns["green_box"].append(_box(detection.green))
+            columns["middle_x"].append(detection.middle_x)
+            columns["offset"].append(np.nan if detection.offset is None else detection.offset)
+            columns["distance"].append(np.nan if detection.distance is None else detection.distance)
+            columns["decision"].append(DECISION_CODES[decide(detection)])
+
+            if annotate_path is not None:
+                if out is None:
+                    height, width = frame.shape[:2]
+                    fps = video.get(cv.CAP_PROP_FPS) or 30
+                    out = cv.VideoWriter(annotate_path, cv.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                out.write(nav.image)
+            index += 1
+    finally:
+        video.release()
+        if out is not None:
+            out.release()
+
+    return {
+        "frame": np.asarray(columns["frame"], np.int32),
+        "pos_ms": np.asarray(columns["pos_ms"], np.float64),
+        "red_box": np.asarray(columns["red_box"], np.int32).reshape(-1, 4),
+        "green_box": np.asarray(columns["green_box"], np.int32).reshape(-1, 4),
+        "middle_x": np.asarray(columns["middle_x"], np.int32),
+        "offset": np.asarray(columns["offset"], np.float32),
+        "distance": np.asarray(columns["distance"], np.float32),
+        "decision": np.asarray(columns["decision"], np.uint8),
+    }
+
+
+def process_video(video_path, output_dir=None, workers=1, annotate=False, nav_kwargs=None, pool=None):
+    nav_kwargs = nav_kwargs or {}
+    base = os.path.splitext(os.path.basename(video_path))[0]
+    output_dir = output_dir or os.path.dirname(os.path.abspath(video_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    count = frame_count(video_path)
+    # Frame-range splitting needs a reliable frame count and seekable video.
+    ranges = split_ranges(count, workers) if count > 0 and pool is not None else [(0, None)]
+
+    def annotate_path(part):
+        if not annotate:
+            return None
+        suffix = "" if len(ranges) == 1 else f"_part{part}"
+        return os.path.join(output_dir, f"{base}_annotated{suffix}.mp4")
+
+    start_time = time.perf_counter()
+    if len(ranges) == 1:
+        chunks = [process_range(video_path, ranges[0][0], ranges[0][1], nav_kwargs, annotate_path(0))]
+    else:
+        futures = [pool.submit(process_range, video_path, start, end, nav_kwargs, annotate_path(i))
+                   for i, (start, end) in enumerate(ranges)]
+        chunks = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start_time
+
+    data = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+    data["decision_names"] = np.array(DECISIONS)
+    out_path = os.path.join(output_dir, f"{base}_detections.npz")
+    np.savez_compressed(out_path, **data)
+
+    frames = len(data["frame"])
+    print(f"✅ {video_path}: {frames} frames in {elapsed:.1f}s ({frames / elapsed if elapsed else 0:.1f} fps) -> {out_path}")
+    return out_path
+
+
+def process_videos(video_paths, output_dir=None, workers=1, annotate=False, nav_kwargs=None):
+    if workers <= 1:
+        return [process_video(path, output_dir, 1, annotate, nav_kwargs) for path in video_paths]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=cv.setNumThreads, initargs=(1,)) as pool:
+        return [process_video(path, output_dir, workers, annotate, nav_kwargs, pool) for path in video_paths]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless batch detection over recorded missions")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--output-dir", default=None, help="Defaults to each video's folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Split each video by frame range across cores")
+    parser.add_argument("--annotate", action="store_true", help="Also write annotated mp4 (one part per worker)")
+    parser.add_argument("--smoothing", default="bilateral", choices=SMOOTHING_MODES)
+    parser.add_argument("--classifier", default="hsv", choices=CLASSIFIERS)
+    args = parser.parse_args()
+
+    process_videos(args.videos, args.output_dir, args.workers, args.annotate,
+                   {"smoothing": args.smoothing, "classifier": args.classifier})
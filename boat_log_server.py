@@ -1,19 +1,187 @@
-import socket
+import argparse
+import asyncio
+import os
+import re
+import time
 
-def start_server(host='172.16.21.153', port=9999):
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
-        server.bind((host, port))
-        server.listen()
-        print(f"🟢 Waiting for connection on {host}:{port}")
-        conn, addr = server.accept()
-        print(f"🔵 Connected by {addr}")
+from tcp_uplink import HELLO_PREFIX
 
-        with conn:
+# Base-station log collector. Any number of boats connect at the same time
+# (and reconnect whenever they like); each boat's lines are appended to its own
+# file, and live lines are fanned out to any number of viewers.
+#
+#   python boat_log_server.py                                # boats on :9999, viewers on :9998
+#   python boat_log_server.py --log-dir runs/day2 --quiet
+#   nc <base-station-ip> 9998                                # watch every boat live
+#
+# Boats send one UTF-8 line per message (TcpUplink in tcp_uplink.py). A first
+# line "BOAT <id>" names the boat; otherwise it is named after its IP address.
+# Lines from a restarted boat are appended to the same file.
+#
+# Ingestion never waits for viewers: each viewer has a bounded queue, and lines
+# that do not fit because that viewer is reading too slowly are dropped (and
+# counted) for that viewer only.
+
+MAX_LINE = 64 * 1024
+FLUSH_INTERVAL = 1.0  # seconds between flushes of the per-boat files
+
+
+class BoatLogServer:
+    def __init__(self, log_dir="boat_logs", echo=True, viewer_queue=5000):
+        self.log_dir = log_dir
+        self.echo = echo
+        self.viewer_queue = viewer_queue
+
+        self.files = {}  # boat id -> [file, open connections]
+        self.viewers = {}  # viewer address -> asyncio.Queue of encoded lines
+        self.counts = {}  # boat id -> lines received
+        self.connections = 0
+        self.oversized = 0
+        self.viewer_drops = 0
+
+    # --- boats ---
+
+    def _open(self, boat):
+        entry = self.files.get(boat)
+        if entry is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = os.path.join(self.log_dir, time.strftime(f"{boat}_%Y%m%d.log"))
+            entry = self.files[boat] = [open(path, "a", encoding="utf-8", buffering=1 << 16), 0]
+            self.counts.setdefault(boat, 0)
+        entry[1] += 1
+        return entry[0]
+
+    def _release(self, boat):
+        entry = self.files[boat]
+        entry[1] -= 1
+        if entry[1] == 0:
+            entry[0].close()
+            del self.files[boat]
+
+    def _store(self, boat, f, line):
+        stamp = time.strftime("%H:%M:%S")
+        f.write(f"{stamp} {line}\n")
+        self.counts[boat] += 1
+        if self.echo:
+            print(f"[{boat}] {line}")
+        self._publish(f"{stamp} [{boat}] {line}\n".encode())
+
+    async def handle_boat(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        boat = re.sub(r"[^\w.-]", "_", str(peer[0]) if peer else "unknown")
+        f = None
+        self.connections += 1
+        try:
             while True:
-                data = conn.recv(1024)
-                if not data:
+                try:
+                    raw = await reader.readline()
+                except ValueError:
+                    self.oversized += 1  # longer than MAX_LINE; asyncio discarded it
+                    continue
+                if not raw:
                     break
-                print(data.decode().strip())
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                if f is None:
+                    if line.startswith(HELLO_PREFIX) and line[len(HELLO_PREFIX):].strip():
+                        boat = re.sub(r"[^\w.-]", "_", line[len(HELLO_PREFIX):].strip())
+                        line = None
+                    f = self._open(boat)
+                    print(f"🔵 {boat} connected from {peer[0] if peer else '?'}")
+                if line is not None:
+                    self._store(boat, f, line)
+                    if self.counts[boat] % 100 == 0:
+                        await asyncio.sleep(0)  # readline() does not yield while lines are buffered
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            if f is not None:
+                self._release(boat)
+                print(f"⚪ {boat} disconnected ({self.counts[boat]} lines so far)")
+            writer.close()
+
+    # --- viewers ---
+
+    def _publish(self, data):
+        for queue in self.viewers.values():
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.viewer_drops += 1
+
+    async def handle_viewer(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        queue = asyncio.Queue(maxsize=self.viewer_queue)
+        self.viewers[peer] = queue
+        print(f"👀 Viewer {peer} attached ({len(self.viewers)} watching)")
+        closed = asyncio.ensure_future(reader.read())  # completes when the viewer hangs up
+        try:
+            while not closed.done():
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait((get, closed), return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    break
+                chunks = [get.result()]
+                while not queue.empty():
+                    chunks.append(queue.get_nowait())
+                writer.write(b"".join(chunks))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.viewers[peer]
+            closed.cancel()
+            writer.close()
+            print(f"👋 Viewer {peer} detached")
+
+    # --- server ---
+
+    async def _flush_files(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            for f, _ in self.files.values():
+                f.flush()
+
+    def stats(self):
+        return {"boats": dict(self.counts), "connected": self.connections, "viewers": len(self.viewers),
+                "viewer_drops": self.viewer_drops, "oversized": self.oversized}
+
+    async def serve(self, host="0.0.0.0", port=9999, viewer_port=9998):
+        boats = await asyncio.start_server(self.handle_boat, host, port, limit=MAX_LINE)
+        viewers = await asyncio.start_server(self.handle_viewer, host, viewer_port) if viewer_port else None
+        print(f"🟢 Waiting for boats on {host}:{port}" + (f", viewers on {host}:{viewer_port}" if viewers else ""))
+        flusher = asyncio.ensure_future(self._flush_files())
+        try:
+            async with boats:
+                if viewers is not None:
+                    async with viewers:
+                        await asyncio.gather(boats.serve_forever(), viewers.serve_forever())
+                else:
+                    await boats.serve_forever()
+        finally:
+            flusher.cancel()
+            for f, _ in self.files.values():
+                f.close()
+            self.files.clear()
+
+
+def start_server(host="0.0.0.0", port=9999, viewer_port=9998, log_dir="boat_logs", echo=True):
+    server = BoatLogServer(log_dir, echo)
+    try:
+        asyncio.run(server.serve(host, port, viewer_port))
+    except KeyboardInterrupt:
+        pass
+    print(f"📊 {server.stats()}")
+
 
 if __name__ == "__main__":
-    start_server()
+    parser = argparse.ArgumentParser(description="Collect log lines from any number of boats")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9999, help="Port the boats connect to")
+    parser.add_argument("--viewer-port", type=int, default=9998, help="Live view of all boats (0 to disable)")
+    parser.add_argument("--log-dir", default="boat_logs")
+    parser.add_argument("--quiet", action="store_true", help="Do not print every line")
+    args = parser.parse_args()
+
+    start_server(args.host, args.port, args.viewer_port, args.log_dir, echo=not args.quiet)
@@ -0,0 +1,137 @@
+import cv2 as cv
+import numpy as np
+
+from vision import Buoy
+
+# Between full-frame searches every buoy is predicted with a constant-velocity
+# Kalman filter and only a window around the prediction is thresholded.
+#
+#   tracker = BuoyTracker(visionNav(), full_every=10)
+#   detection = tracker.update(frame)
+
+
+class KalmanTrack:
+    def __init__(self, buoy, process_noise=1.0, measurement_noise=4.0):
+        kf = cv.KalmanFilter(4, 2)  # state: cx, cy, vx, vy (pixels, pixels/frame)
+        kf.transitionMatrix = np.array([[1, 0, 1, 0],
+                                        [0, 1, 0, 1],
+                                        [0, 0, 1, 0],
+                                        [0, 0, 0, 1]], np.float32)
+        kf.measurementMatrix = np.array([[1, 0, 0, 0],
+                                         [0, 1, 0, 0]], np.float32)
+        kf.processNoiseCov = np.eye(4, dtype=np.float32) * process_noise
+        kf.measurementNoiseCov = np.eye(2, dtype=np.float32) * measurement_noise
+        kf.errorCovPost = np.eye(4, dtype=np.float32) * 10
+        kf.statePost = np.array([[buoy.cx], [buoy.cy], [0], [0]], np.float32)
+        self.kf = kf
+        self.w = buoy.w
+        self.h = buoy.h
+        self.area = buoy.area
+        self.misses = 0
+
+    def predict(self):
+        state = self.kf.predict()
+        return int(state[0, 0]), int(state[1, 0])
+
+    def correct(self, buoy):
+        self.kf.correct(np.array([[buoy.cx], [buoy.cy]], np.float32))
+        self.w = buoy.w
+        self.h = buoy.h
+        self.area = buoy.area
+        self.misses = 0
+
+    def buoy(self):
+        cx, cy = int(self.kf.statePost[0, 0]), int(self.kf.statePost[1, 0])
+        return Buoy(cx - self.w // 2, cy - self.h // 2, self.w, self.h, cx, cy, self.area)
+
+
+class BuoyTracker:
+    def __init__(self, nav, full_every=10, window_scale=3.0, min_window=96, max_misses=3, min_area=1000):
+        self.nav = nav
+        self.full_every = full_every
+        self.window_scale = window_scale  # search window size as a multiple of the buoy box
+        self.min_window = min_window
+        self.max_misses = max_misses
+        self.min_area = min_area
+
+        self.tracks = {"red": None, "green": None}
+        self.frame_index = 0
+        self.last_full = None
+        self.full_searches = 0
+        self.roi_searches = 0
+        self._lost = False
+
+    def _window(self, track, center, width, height):
+        cx, cy = center
+        half_w = max(self.min_window, int(track.w * self.window_scale)) // 2
+        half_h = max(self.min_window, int(track.h * self.window_scale)) // 2
+        x0, y0 = max(0, cx - half_w), max(0, cy - half_h)
+        x1, y1 = min(width, cx + half_w), min(height, cy + half_h)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return None
+        return x0, y0, x1, y1
+
+    def _search_window(self, image, colour, track):
+        height, width = image.shape[:2]
+        window = self._window(track, track.predict(), width, height)
+        if window is None:
+            return None
+        x0, y0, x1, y1 = window
+        mask_r, mask_g = self.nav.compute_masks(image[y0:y1, x0:x1])
+        found = self.nav.find_buoy(mask_r if colour == "red" else mask_g, self.min_area)
+        if found is None:
+            return None
+        return Buoy(found.x + x0, found.y + y0, found.w, found.h, found.cx + x0, found.cy + y0, found.area)
+
+    def _full_search(self, image):
+        self.nav.image = image
+        self.nav.generate_masks()
+        self.full_searches += 1
+        self.last_full = self.frame_index
+        self._lost = False
+        return {"red": self.nav.find_buoy(self.nav.mask_r, self.min_area),
+                "green": self.nav.find_buoy(self.nav.mask_g, self.min_area)}
+
+    def _due_full_search(self):
+        if self.last_full is None or self._lost:
+            return True
+        if all(track is None for track in self.tracks.values()):
+            return True
+        return self.frame_index - self.last_full >= self.full_every
+
+    def update(self, image):
+        self.nav.image = image
+        height, width = image.shape[:2]
+
+        if self._due_full_search():
+            found = self._full_search(image)
+            for colour, buoy in found.items():
+                track = self.tracks[colour]
+                if buoy is None:
+                    self.tracks[colour] = None
+                elif track is None:
+                    self.tracks[colour] = KalmanTrack(buoy)
+                else:
+                    track.predict()
+                    track.correct(buoy)
+        else:
+            self.roi_searches += 1
+            for colour, track in self.tracks.items():
+                if track is None:
+                    continue
+                buoy = self._search_window(image, colour, track)
+                if buoy is not None:
+                    track.correct(buoy)
+                    continue
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    self.tracks[colour] = None
+                    self._lost = True
+
+        red = self.tracks["red"].buoy() if self.tracks["red"] else None
+        green = self.tracks["green"].buoy() if self.tracks["green"] else None
+        detection = self.nav.store_detection(self.nav.build_detection(red, green, width, height))
+        self.frame_index += 1
+        if self.nav.draw:
+            self.nav.annotate(detection)
+        return detection
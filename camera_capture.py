@@ -0,0 +1,212 @@
+import argparse
+import os
+import time
+from collections import deque
+
+import cv2 as cv
+import numpy as np
+
+# Camera (or file) capture tuned for low latency. Drop-in for cv.VideoCapture:
+#   video = open_camera(0, width=640, height=480)                 # USB webcam, V4L2 + MJPG, 1-frame buffer
+#   video = open_camera(backend="libcamera", width=640, height=480)  # Pi camera through GStreamer
+#   video = open_camera("runs/heat1.mp4")                          # recorded file, same interface
+#   ... video.read() ... video.stats()
+#
+#   python camera_capture.py --backend v4l2 --width 640 --height 480   (prints negotiated mode, fps, latency)
+#
+# The processing size is requested from the sensor itself; if the driver
+# insists on something bigger, frames are downscaled once here so vision never
+# works on more pixels than it needs.
+
+BACKENDS = ("auto", "v4l2", "gstreamer", "libcamera", "file")
+
+LIBCAMERA_PIPELINE = (
+    "libcamerasrc ! video/x-raw,width={width},height={height},framerate={fps}/1 ! "
+    "videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false"
+)
+V4L2_GST_PIPELINE = (
+    "v4l2src device=/dev/video{index} ! image/jpeg,width={width},height={height},framerate={fps}/1 ! "
+    "jpegdec ! videoconvert ! video/x-raw,format=BGR ! appsink drop=true max-buffers=1 sync=false"
+)
+
+
+def _fourcc_name(value):
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00") or "?"
+
+
+class CameraCapture:
+    def __init__(self, cap, backend, source, size=None, window=120):
+        self.cap = cap
+        self.backend = backend
+        self.source = source
+        self.size = size  # (width, height) handed to vision; None keeps the native size
+        self.captured_at = None  # monotonic time the last frame was exposed (or read, if unknown)
+
+        self.frames = 0
+        self.resized = 0
+        self._read_ms = deque(maxlen=window)
+        self._age_ms = deque(maxlen=window)
+        self._stamps = deque(maxlen=window)
+        self._use_driver_time = backend == "v4l2"
+
+    # --- cv.VideoCapture interface ---
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        start = time.monotonic()
+        ret, frame = self.cap.read()
+        now = time.monotonic()
+        if not ret:
+            return False, None
+
+        self.captured_at = now
+        if self._use_driver_time:
+            # V4L2 buffer timestamps are CLOCK_MONOTONIC, the same clock as
+            # time.monotonic(), so their difference is the real frame age.
+            stamp = self.cap.get(cv.CAP_PROP_POS_MSEC) / 1000.0
+            if 0.0 < now - stamp < 5.0:
+                self.captured_at = stamp
+                self._age_ms.append((now - stamp) * 1000)
+            else:
+                self._use_driver_time = False
+
+        if self.size and (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv.resize(frame, self.size, dst=image, interpolation=cv.INTER_AREA)
+            self.resized += 1
+        elif image is not None and image.shape == frame.shape:
+            image[...] = frame
+            frame = image
+
+        self.frames += 1
+        self._read_ms.append((now - start) * 1000)
+        self._stamps.append(now)
+        return True, frame
+
+    def get(self, prop):
+        if self.size and prop == cv.CAP_PROP_FRAME_WIDTH:
+            return self.size[0]
+        if self.size and prop == cv.CAP_PROP_FRAME_HEIGHT:
+            return self.size[1]
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+    # --- reporting ---
+
+    def native_size(self):
+        return int(self.cap.get(cv.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv.CAP_PROP_FRAME_HEIGHT))
+
+    def stats(self):
+        fps = None
+        if len(self._stamps) > 1 and self._stamps[-1] > self._stamps[0]:
+            fps = (len(self._stamps) - 1) / (self._stamps[-1] - self._stamps[0])
+        read_ms = np.asarray(self._read_ms) if self._read_ms else None
+        age_ms = np.asarray(self._age_ms) if self._age_ms else None
+        return {
+            "backend": self.backend,
+            "native_size": self.native_size(),
+            "size": self.size or self.native_size(),
+            "fourcc": _fourcc_name(self.cap.get(cv.CAP_PROP_FOURCC)),
+            "frames": self.frames,
+            "resized": self.resized,
+            "fps": round(fps, 1) if fps else None,
+            "read_ms_p50": round(float(np.percentile(read_ms, 50)), 2) if read_ms is not None else None,
+            "read_ms_p95": round(float(np.percentile(read_ms, 95)), 2) if read_ms is not None else None,
+            "age_ms_p50": round(float(np.percentile(age_ms, 50)), 2) if age_ms is not None else None,
+        }
+
+
+def _open_v4l2(index, width, height, fps):
+    cap = cv.VideoCapture(index, cv.CAP_V4L2)
+    if not cap.isOpened():
+        return cap
+    # Order matters on most UVC drivers: fourcc first, then the size it should apply to.
+    cap.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*"MJPG"))
+    cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv.CAP_PROP_FPS, fps)
+    cap.set(cv.CAP_PROP_BUFFERSIZE, 1)  # always hand out the newest frame, not a queued one
+    return cap
+
+
+def _open_gstreamer(pipeline):
+    return cv.VideoCapture(pipeline, cv.CAP_GSTREAMER)
+
+
+def open_camera(source=0, backend="auto", width=640, height=480, fps=30, pipeline=None):
+    # source: camera index, device path (/dev/video0) or a video file.
+    # pipeline overrides the built-in GStreamer pipeline string.
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown capture backend {backend!r}, expected one of {BACKENDS}")
+
+    if isinstance(source, str) and not source.startswith("/dev/video"):
+        if backend not in ("auto", "file"):
+            raise ValueError(f"{backend} needs a camera index, got {source!r}")
+        if not os.path.exists(source):
+            raise IOError(f"No such video file: {source}")
+        cap = cv.VideoCapture(source)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video file {source}")
+        return CameraCapture(cap, "file", source)
+
+    index = int(source[len("/dev/video"):]) if isinstance(source, str) else int(source)
+    size = (int(width), int(height)) if width and height else None
+    params = {"index": index, "width": width, "height": height, "fps": int(fps)}
+
+    if backend == "libcamera":
+        candidates = [("libcamera", lambda: _open_gstreamer(pipeline or LIBCAMERA_PIPELINE.format(**params)))]
+    elif backend == "gstreamer":
+        candidates = [("gstreamer", lambda: _open_gstreamer(pipeline or V4L2_GST_PIPELINE.format(**params)))]
+    elif backend == "v4l2":
+        candidates = [("v4l2", lambda: _open_v4l2(index, width, height, fps))]
+    else:
+        candidates = [("v4l2", lambda: _open_v4l2(index, width, height, fps)),
+                      ("any", lambda: cv.VideoCapture(index))]
+
+    for name, opener in candidates:
+        cap = opener()
+        if cap.isOpened():
+            camera = CameraCapture(cap, name, source)
+            native = camera.native_size()
+            if size and native != size:
+                # Only ever shrink: upscaling a smaller mode adds pixels, not detail.
+                if native[0] > size[0] or native[1] > size[1]:
+                    camera.size = size
+                print(f"[CAM] Asked for {size[0]}x{size[1]}, {name} gave {native[0]}x{native[1]}"
+                      + ("; resizing frames" if camera.size else ""))
+            else:
+                print(f"[CAM] {name} capture at {native[0]}x{native[1]} ({_fourcc_name(cap.get(cv.CAP_PROP_FOURCC))})")
+            return camera
+        cap.release()
+    raise IOError(f"Could not open camera {source!r} with backend {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open the camera with a tuned backend and report fps/latency")
+    parser.add_argument("--source", default="0", help="Camera index, /dev/videoN or a video file")
+    parser.add_argument("--backend", default="auto", choices=BACKENDS)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--pipeline", default=None, help="Custom GStreamer pipeline (must end in appsink)")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    camera = open_camera(source, args.backend, args.width, args.height, args.fps, args.pipeline)
+    try:
+        for _ in range(args.frames):
+            ret, _ = camera.read()
+            if not ret:
+                break
+        for key, value in camera.stats().items():
+            print(f"  {key:12} {value}")
+    finally:
+        camera.release()
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+import numpy as np
+from pymavlink import mavutil
+
+# COMMAND_LONG with acknowledgement, without blocking the caller. submit()
+# sends (see below) and returns a Future that resolves to the COMMAND_ACK
+# (MAV_RESULT_ACCEPTED), or fails with CommandFailed (rejected) or
+# TimeoutError (no ACK after all retries).
+#
+#   future = hub.commands.submit(mavutil.mavlink.MAV_CMD_DO_SET_SERVO, 1, 1500)   # fire and forget
+#   hub.commands.submit(mavutil.mavlink.MAV_CMD_DO_PAUSE_CONTINUE, 1).result()    # wait for the ACK
+#   hub.commands.stats()   # per-command round trip p50/p95/max, retries, timeouts
+#
+# A COMMAND_ACK only names the command, so only one command per id is in
+# flight at a time: later submits of the same id wait in line and are sent
+# once the one ahead of them is ACKed or has timed out. Different ids are
+# still sent straight away.
+
+
+class CommandFailed(Exception):
+    def __init__(self, command, result):
+        self.command = command
+        self.result = result
+        super().__init__(f"{command_name(command)} rejected: {result_name(result)}")
+
+
+def command_name(command):
+    entry = mavutil.mavlink.enums["MAV_CMD"].get(command)
+    return entry.name if entry else str(command)
+
+
+def result_name(result):
+    entry = mavutil.mavlink.enums["MAV_RESULT"].get(result)
+    return entry.name if entry else str(result)
+
+
+class _Pending:
+    __slots__ = ("command", "params", "future", "timeout", "retries_left", "attempt", "sent_at", "deadline")
+
+    def __init__(self, command, params, timeout, retries):
+        self.command = command
+        self.params = params
+        self.future = Future()
+        self.timeout = timeout
+        self.retries_left = retries
+        self.attempt = 0
+        self.sent_at = None
+        self.deadline = None
+
+
+class CommandQueue:
+    def __init__(self, hub, timeout=0.5, retries=2, window=200):
+        self.hub = hub
+        self.timeout = timeout  # seconds to wait for each attempt's ACK
+        self.retries = retries  # resends after the first attempt
+        self._pending = defaultdict(deque)  # command id -> oldest first
+        self._cond = threading.Condition()
+        self._rtt = defaultdict(lambda: deque(maxlen=window))  # command id -> seconds
+        self.counts = defaultdict(lambda: {"sent": 0, "acked": 0, "retries": 0, "timeouts": 0, "rejected": 0})
+
+        hub.subscribe("COMMAND_ACK", self._on_ack)
+        self._thread = threading.Thread(target=self._watch_deadlines, name="mavlink-commands", daemon=True)
+        self._thread.start()
+
+    def submit(self, command, *params, timeout=None, retries=None):
+        pending = _Pending(command, (list(params) + [0] * 7)[:7],
+                           self.timeout if timeout is None else timeout,
+                           self.retries if retries is None else retries)
+        with self._cond:
+            queue = self._pending[command]
+            queue.append(pending)
+            if len(queue) == 1:
+                self._send(pending)
+                self._cond.notify()
+        return pending.future
+
+    def _send(self, pending):
+        # Called with the lock held; the hub only queues the bytes.
+        self.hub.command_long(pending.command, *pending.params, confirmation=pending.attempt)
+        pending.sent_at = time.monotonic()
+        pending.deadline = pending.sent_at + pending.timeout
+        self.counts[pending.command]["sent"] += 1
+
+    def _on_ack(self, msg):
+        with self._cond:
+            queue = self._pending.get(msg.command)
+            if not queue:
+                return  # ACK for a command someone else sent, or a late duplicate
+            pending = queue[0]
+            if msg.result == mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+                pending.deadline = time.monotonic() + pending.timeout
+                return
+            queue.popleft()
+            if queue:
+                self._send(queue[0])
+                self._cond.notify()
+            counts = self.counts[msg.command]
+            if msg.result == mavutil.mavlink.MAV_RESULT_ACCEPTED:
+                counts["acked"] += 1
+                self._rtt[msg.command].append(time.monotonic() - pending.sent_at)
+            else:
+                counts["rejected"] += 1
+        if msg.result == mavutil.mavlink.MAV_RESULT_ACCEPTED:
+            pending.future.set_result(msg)
+        else:
+            pending.future.set_exception(CommandFailed(msg.command, msg.result))
+
+    def _watch_deadlines(self):
+        while not self.hub.closed:
+            expired = []
+            with self._cond:
+                now = time.monotonic()
+                next_deadline = None
+                for command, queue in self._pending.items():
+                    if not queue:
+                        continue
+                    pending = queue[0]  # only the head of each line is in flight
+                    if pending.deadline <= now:
+                        if pending.retries_left > 0:
+                            pending.retries_left -= 1
+                            pending.attempt += 1
+                            self.counts[command]["retries"] += 1
+                        else:
+                            queue.popleft()
+                            self.counts[command]["timeouts"] += 1
+                            expired.append(pending)
+                            if not queue:
+                                continue
+                            pending = queue[0]
+                        self._send(pending)
+                    next_deadline = min(next_deadline or pending.deadline, pending.deadline)
+                if not expired:
+                    wait = 0.5 if next_deadline is None else max(0.0, next_deadline - now)
+                    self._cond.wait(min(wait, 0.5))
+            for pending in expired:
+                pending.future.set_exception(TimeoutError(
+                    f"No ACK for {command_name(pending.command)} after {pending.attempt + 1} attempts"))
+
+    def in_flight(self):
+        with self._cond:
+            return sum(len(queue) for queue in self._pending.values())
+
+    def stats(self):
+        report = {}
+        with self._cond:
+            for command, counts in self.counts.items():
+                entry = dict(counts)
+                rtt = np.asarray(self._rtt[command]) * 1000 if self._rtt[command] else None
+                if rtt is not None:
+                    entry.update(rtt_p50_ms=round(float(np.percentile(rtt, 50)), 1),
+                                 rtt_p95_ms=round(float(np.percentile(rtt, 95)), 1),
+                                 rtt_max_ms=round(float(rtt.max()), 1))
+                report[command_name(command)] = entry
+        return report
@@ -0,0 +1,190 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from camera_capture import open_camera
+from mavlink_hub import MavlinkHub
+from pipeline import VisionPipeline, run_vision
+from pwm_controller import PWMController, DECISION_OUTPUTS, STEERING_CHANNEL, THROTTLE_CHANNEL
+from vehicle_sim import VehicleSim
+from vision import visionNav, decide, SMOOTHING_MODES
+from vision_benchmark import synthetic_frame, percentiles
+
+# Frame-to-servo latency without hardware: recorded (or synthetic) frames go
+# through the real VisionPipeline and PWMController into vehicle_sim over UDP
+# on localhost. Latency is capture time -> the simulator receiving the servo
+# value, on the same monotonic clock.
+#
+#   python control_latency_bench.py --frames 300
+#   python control_latency_bench.py --video runs/heat1.mp4 --ack-delay 0.03 --loss 0.05 --output servo
+#
+# Decisions come from vision.decide (as in main_vision_filepicker.py) and
+# outputs from PWMController.apply_decision, which uses the same PWM table as
+# the steer/forward helpers the control loops call. --output rc (default)
+# goes through ActuatorOutput (only changed values are sent, so only frames
+# that change the outputs are measured); --output servo sends DO_SET_SERVO for
+# both channels on every frame, the legacy path.
+
+
+def bench_decision(result):
+    if not result.has_masks:
+        return "TURN_AROUND"
+    return decide(result.detection)
+
+
+def changing_frames(count, width, height, period=4, seed=0):
+    # Synthetic gate that switches between near and far every `period` frames
+    # while drifting across the centre line, so the decision (and the steering
+    # output) changes every few frames instead of staying constant.
+    rng = np.random.default_rng(seed)
+    radius = max(8, width // 18)
+    cy = int(height * 0.6)
+    frames = []
+    for i in range(count):
+        centre = 0.5 + 0.05 * np.sin(2 * np.pi * i / 10)
+        half = 0.44 if (i // period) % 2 == 0 else 0.25
+        green = (int(width * (centre - half)), cy)
+        red = (int(width * (centre + half)), cy)
+        frames.append(synthetic_frame(width, height, red, green, radius, rng)[0])
+    return frames
+
+
+class PacedFrames:
+    # VideoCapture-like source that releases preloaded frames at a fixed rate.
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.interval = 1.0 / fps
+        self.index = 0
+        self.captured_at = None
+        self._next = None
+
+    def isOpened(self):
+        return self.index < len(self.frames)
+
+    def read(self):
+        if self.index >= len(self.frames):
+            return False, None
+        now = time.monotonic()
+        if self._next is not None and now < self._next:
+            time.sleep(self._next - now)
+        self.captured_at = time.monotonic()
+        self._next = self.captured_at + self.interval
+        frame = self.frames[self.index]
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        self.index = len(self.frames)
+
+
+def match_latencies(events, servo_log, channel):
+    # events: [(captured_at, sent_at, pwm)] in order. For each, the first time
+    # the simulator saw that pwm on the channel after it was sent.
+    log = [(t, pwm) for t, ch, pwm, _ in servo_log if ch == channel]
+    latencies, missed, i = [], 0, 0
+    for captured_at, sent_at, pwm in events:
+        while i < len(log) and log[i][0] < sent_at:
+            i += 1
+        j = i
+        while j < len(log) and log[j][1] != pwm:
+            j += 1
+        if j < len(log):
+            latencies.append(log[j][0] - captured_at)
+            i = j
+        else:
+            missed += 1  # coalesced away or lost
+    return latencies, missed
+
+
+def run_bench(frames, fps=30.0, output="rc", smoothing="bilateral", ack_delay=0.0, loss=0.0, port=14561):
+    sim = VehicleSim(f"udpout:127.0.0.1:{port}", ack_delay=ack_delay, loss=loss, heartbeat_hz=10).start()
+    hub = MavlinkHub(f"udpin:127.0.0.1:{port}", heartbeat_timeout=10)
+    pwm = PWMController(hub=hub)
+    nav = visionNav(smoothing=smoothing, draw=False)
+
+    events = []  # (captured_at, sent_at, steering pwm) for every transmitted change
+
+    def actuate(frame, result):
+        decision = bench_decision(result)
+        steering, throttle = DECISION_OUTPUTS[decision]
+        sent_at = time.monotonic()
+        if output == "servo":
+            pwm.send_pwm(STEERING_CHANNEL, steering)
+            pwm.send_pwm(THROTTLE_CHANNEL, throttle)
+            events.append((frame.captured_at, sent_at, steering))
+        elif pwm.apply_decision(decision):
+            events.append((frame.captured_at, sent_at, steering))
+
+    pipeline = VisionPipeline(PacedFrames(frames, fps), lambda frame: run_vision(nav, frame), actuate)
+    stats = pipeline.run()
+    time.sleep(max(0.5, 3 * ack_delay))  # let the last messages and ACKs land
+
+    latencies, missed = match_latencies(events, sim.servo_log, STEERING_CHANNEL)
+    report = {
+        "output": output,
+        "frames": len(frames),
+        "fps": fps,
+        "ack_delay_ms": ack_delay * 1000,
+        "loss": loss,
+        "pipeline": stats,
+        "measured": len(latencies),
+        "unmatched": missed,
+        "frame_to_servo": dict(percentiles(latencies), max_ms=float(np.max(latencies) * 1000)) if latencies else None,
+        "commands": hub.commands.stats(),
+        "actuator": pwm.output.stats(),
+        "sim": {"received": sim.received, "dropped": sim.dropped, "acks": sim.acks},
+    }
+    pwm.output.close(release=False)
+    hub.close()
+    sim.stop()
+    return report
+
+
+def print_report(report):
+    print(f"\noutput={report['output']}  frames={report['frames']} @ {report['fps']} fps  "
+          f"ack delay {report['ack_delay_ms']:.0f} ms  loss {report['loss']:.0%}")
+    lat = report["frame_to_servo"]
+    if lat:
+        print(f"frame -> servo: p50 {lat['p50_ms']:.1f}  p95 {lat['p95_ms']:.1f}  p99 {lat['p99_ms']:.1f}  max {lat['max_ms']:.1f} ms"
+              f"  ({report['measured']} measured, {report['unmatched']} unmatched)")
+    else:
+        print("frame -> servo: no output changes measured")
+    for name, entry in report["commands"].items():
+        if "rtt_p50_ms" in entry:
+            print(f"  {name:28} rtt p50 {entry['rtt_p50_ms']:.1f}  p95 {entry['rtt_p95_ms']:.1f} ms"
+                  f"  retries {entry['retries']}  timeouts {entry['timeouts']}")
+    print(f"  pipeline {report['pipeline']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frame-to-servo latency against the simulated vehicle")
+    parser.add_argument("--video", default=None, help="Recorded video; synthetic frames if omitted")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--output", default="rc", choices=("rc", "servo"))
+    parser.add_argument("--smoothing", default="bilateral", choices=SMOOTHING_MODES)
+    parser.add_argument("--ack-delay", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=14561)
+    parser.add_argument("--out", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.video:
+        video = open_camera(args.video)
+        frames = []
+        while len(frames) < args.frames:
+            ret, frame = video.read()
+            if not ret:
+                break
+            frames.append(frame)
+        video.release()
+    else:
+        frames = changing_frames(args.frames, 640, 480)
+
+    report = run_bench(frames, args.fps, args.output, args.smoothing, args.ack_delay, args.loss, args.port)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,237 @@
+import argparse
+import csv
+import math
+import os
+import time
+
+import numpy as np
+
+from vision import DECISIONS
+
+# Structured flight data: one fixed-size binary record per control decision,
+# appended to a preallocated, memory-mapped file. Analysis memory-maps the
+# file back and gets every field as a NumPy column, no text parsing.
+#
+#   flight = FlightRecorder()                       # logs/flight_<date>_<time>.fdr
+#   flight.record(frame.seq, result.detection, decision, steering, throttle, qgc.telemetry, t=frame.captured_at)
+#   flight.close()
+#
+#   log = FlightLog("logs/flight_20250601_101500.fdr")
+#   log["middle_x"], log["red"][:, 0], log.decisions(), log.seconds()
+#
+#   python flight_recorder.py logs/flight_20250601_101500.fdr --csv flight.csv
+#
+# The record count lives in the file header and is updated with every record,
+# so a file can be read while it is being written, and a crash of the boat
+# process loses nothing the kernel already has.
+
+DEFAULT_FLIGHT_PATH = os.path.join("logs", "flight_%Y%m%d_%H%M%S.fdr")
+
+RECORD = np.dtype([
+    ("time", "f8"),           # time.monotonic() (the frame's capture time when given)
+    ("frame", "i8"),          # frame sequence number
+    ("red", "i2", (4,)),      # biggest red buoy x y w h, -1 when not seen
+    ("green", "i2", (4,)),    # biggest green buoy x y w h, -1 when not seen
+    ("middle_x", "f4"),       # NaN when not available
+    ("distance", "f4"),       # NaN when not lined up between the buoys
+    ("decision", "u1"),       # index into DECISIONS, NO_DECISION when none
+    ("armed", "i1"),          # 1 / 0, -1 unknown
+    ("steering", "u2"),       # PWM sent, 0 when not overridden
+    ("throttle", "u2"),
+    ("mission_seq", "i4"),    # -1 unknown
+    ("custom_mode", "i4"),    # autopilot mode number from HEARTBEAT, -1 unknown
+    ("lat", "f8"),            # degrees, NaN unknown
+    ("lon", "f8"),
+    ("heading", "f4"),        # degrees
+    ("groundspeed", "f4"),    # m/s
+    ("battery_v", "f4"),
+    ("position_age", "f4"),   # seconds since the position was received
+])
+
+NO_DECISION = 255
+_NO_BOX = (-1, -1, -1, -1)
+_NAN = float("nan")
+
+_MAGIC = int.from_bytes(b"FLIGHTv1", "little")
+_VERSION = 1
+_HEADER_FIELDS = 8  # magic, version, record size, count, capacity, start wall ns, start monotonic ns, spare
+_COUNT, _CAPACITY = 3, 4
+_HEADER_BYTES = _HEADER_FIELDS * 8
+
+
+class FlightRecorder:
+    def __init__(self, path=DEFAULT_FLIGHT_PATH, capacity=108000):
+        # capacity: records preallocated up front (an hour at 30 fps); the file doubles when full.
+        self.path = time.strftime(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.truncate(_HEADER_BYTES + capacity * RECORD.itemsize)
+        self.header = np.memmap(self.path, np.int64, mode="r+", shape=(_HEADER_FIELDS,))
+        self.header[:] = (_MAGIC, _VERSION, RECORD.itemsize, 0, capacity, time.time_ns(), time.monotonic_ns(), 0)
+        self.records = None
+        self.count = 0
+        self.capacity = 0
+        self._map(capacity)
+
+    def _map(self, capacity):
+        if self.records is not None:
+            self.records.flush()
+            self.records = None
+            with open(self.path, "r+b") as f:
+                f.truncate(_HEADER_BYTES + capacity * RECORD.itemsize)
+        self.records = np.memmap(self.path, RECORD, mode="r+", offset=_HEADER_BYTES, shape=(capacity,))
+        self.capacity = capacity
+        self.header[_CAPACITY] = capacity
+
+    def record(self, frame_index, detection=None, decision=None, steering=None, throttle=None, telemetry=None, t=None):
+        # detection: vision.Detection, decision: one of DECISIONS, telemetry: a TelemetryCache.
+        if self.count == self.capacity:
+            self._map(self.capacity * 2)
+
+        red = green = None
+        middle_x = distance = _NAN
+        if detection is not None:
+            red, green = detection.red, detection.green
+            middle_x = _NAN if detection.middle_x is None else detection.middle_x
+            distance = _NAN if detection.distance is None else detection.distance
+
+        armed, seq, mode = -1, -1, -1
+        lat = lon = heading = speed = volts = position_age = _NAN
+        if telemetry is not None:
+            heartbeat = telemetry.get("HEARTBEAT")
+            if heartbeat is not None:
+                armed = int(telemetry.armed())
+                mode = heartbeat.custom_mode
+            position = telemetry.position()
+            if position is not None:
+                lat, lon, position_age = position.lat, position.lon, position.age
+                heading = _NAN if position.heading is None else position.heading
+            seq = telemetry.mission_seq()
+            seq = -1 if seq is None else seq
+            speed = telemetry.groundspeed()
+            speed = _NAN if speed is None else speed
+            battery = telemetry.battery()
+            volts = battery[0] if battery else _NAN
+
+        self.records[self.count] = (
+            time.monotonic() if t is None else t, frame_index,
+            red[:4] if red else _NO_BOX, green[:4] if green else _NO_BOX,
+            middle_x, distance,
+            DECISIONS.index(decision) if decision in DECISIONS else NO_DECISION, armed,
+            steering or 0, throttle or 0, seq, mode,
+            lat, lon, heading, speed, volts, position_age)
+        self.count += 1
+        self.header[_COUNT] = self.count
+
+    def flush(self):
+        # Forces the records to disk (only matters if the whole machine may lose power).
+        self.records.flush()
+        self.header.flush()
+
+    def close(self):
+        if self.records is None:
+            return
+        self.flush()
+        self.records = None
+        self.header[_CAPACITY] = self.count
+        self.header.flush()
+        self.header = None
+        with open(self.path, "r+b") as f:
+            f.truncate(_HEADER_BYTES + self.count * RECORD.itemsize)  # drop the unused preallocation
+        print(f"[FLIGHT] {self.count} records written to {self.path}")
+
+
+class FlightLog:
+    # Read-only view of a recorder file; columns are memory-mapped, nothing is copied.
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, np.int64, count=_HEADER_FIELDS)
+        if len(header) < _HEADER_FIELDS or header[0] != _MAGIC:
+            raise ValueError(f"{path} is not a flight recorder file")
+        if header[1] != _VERSION or header[2] != RECORD.itemsize:
+            raise ValueError(f"{path}: unsupported record format (version {header[1]}, {header[2]} byte records)")
+        self.count = int(header[_COUNT])
+        self.start_wall = header[5] / 1e9  # time.time() when recording started
+        self.start_monotonic = header[6] / 1e9
+        if self.count:
+            self.records = np.memmap(path, RECORD, mode="r", offset=_HEADER_BYTES, shape=(self.count,))
+        else:
+            self.records = np.zeros(0, RECORD)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, column):
+        return self.records[column]
+
+    @property
+    def columns(self):
+        return RECORD.names
+
+    def seconds(self):
+        # Record times relative to the start of the recording.
+        return self.records["time"] - self.start_monotonic
+
+    def wall_time(self):
+        return self.seconds() + self.start_wall
+
+    def decisions(self):
+        names = np.array(DECISIONS + ("",) * (NO_DECISION + 1 - len(DECISIONS)))
+        return names[self.records["decision"]]
+
+    def summary(self):
+        seconds = self.seconds()
+        decision = self.records["decision"]
+        counts = {name: int(np.count_nonzero(decision == i)) for i, name in enumerate(DECISIONS)}
+        return {
+            "records": self.count,
+            "duration_s": float(seconds[-1] - seconds[0]) if self.count else 0.0,
+            "decisions": counts,
+            "red_seen": int(np.count_nonzero(self.records["red"][:, 2] > 0)),
+            "green_seen": int(np.count_nonzero(self.records["green"][:, 2] > 0)),
+        }
+
+    def to_csv(self, path):
+        with open(path, "w", newline='') as f:
+            writer = csv.writer(f)
+            header = []
+            for name in RECORD.names:
+                if name in ("red", "green"):
+                    header += [f"{name}_{k}" for k in "xywh"]
+                else:
+                    header.append(name)
+            writer.writerow(["seconds"] + header)
+            decisions = self.decisions()
+            seconds = self.seconds()
+            for i, row in enumerate(self.records):
+                out = [f"{seconds[i]:.3f}"]
+                for name in RECORD.names:
+                    value = row[name]
+                    if name in ("red", "green"):
+                        out += value.tolist()
+                    elif name == "decision":
+                        out.append(decisions[i])
+                    elif value.dtype.kind == "f" and math.isnan(value):
+                        out.append("")
+                    else:
+                        out.append(str(value))
+                writer.writerow(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise or export a flight recorder file")
+    parser.add_argument("path")
+    parser.add_argument("--csv", default=None, help="Export every record as CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    log = FlightLog(args.path)
+    loaded = time.perf_counter() - start
+    print(f"[FLIGHT] {args.path}: loaded in {loaded * 1000:.2f} ms")
+    for key, value in log.summary().items():
+        print(f"  {key}: {value}")
+    if args.csv:
+        log.to_csv(args.csv)
+        print(f"[FLIGHT] Wrote {args.csv}")
@@ -0,0 +1,254 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+import cv2 as cv
+import numpy as np
+
+# Fixed-size ring of camera frames in shared memory. One writer (CaptureService)
+# fills preallocated slots; any number of readers in this or other processes
+# get zero-copy, read-only views by sequence number.
+#
+#   ring = FrameRing.create("boat_cam", capacity=8, shape=(480, 640, 3))
+#   CaptureService(cv.VideoCapture(0), ring).start()
+#   nav = visionNav(video=RingReader(ring))               # same process
+#   reader = RingReader(FrameRing.attach("boat_cam"))      # other process
+#
+# A view stays valid until the writer laps it (capacity frames later); check
+# ring.valid(seq) after using a frame if that matters.
+
+_HEADER_FIELDS = 8  # next_seq, capacity, height, width, channels, closed, spare, spare
+_ALIGN = 64
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class RingOverrun(Exception):
+    pass
+
+
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((_HEADER_FIELDS,), np.int64, buffer=shm.buf)
+        capacity, height, width, channels = (int(v) for v in self.header[1:5])
+        self.capacity = capacity
+        self.shape = (height, width, channels)
+
+        offset = _aligned(self.header.nbytes)
+        self.slot_seq = np.ndarray((capacity,), np.int64, buffer=shm.buf, offset=offset)
+        offset = _aligned(offset + self.slot_seq.nbytes)
+        self.slot_time = np.ndarray((capacity,), np.float64, buffer=shm.buf, offset=offset)
+        offset = _aligned(offset + self.slot_time.nbytes)
+        self.slots = np.ndarray((capacity,) + self.shape, np.uint8, buffer=shm.buf, offset=offset)
+
+    @staticmethod
+    def _size(capacity, shape):
+        size = _aligned(_HEADER_FIELDS * 8)
+        size = _aligned(size + capacity * 8)
+        size = _aligned(size + capacity * 8)
+        return size + capacity * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, name=None, capacity=8, shape=(480, 640, 3)):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(capacity, shape))
+        header = np.ndarray((_HEADER_FIELDS,), np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[1] = capacity
+        header[2:5] = shape
+        del header
+        ring = cls(shm, owner=True)
+        ring.slot_seq[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        # Only the creating process may unlink the block. Children started with
+        # multiprocessing share the creator's resource tracker; independent
+        # processes get their own, which would unlink the ring when they exit.
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            if multiprocessing.parent_process() is None:
+                resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def head(self):
+        # Sequence number the next frame will get; head - 1 is the newest.
+        return int(self.header[0])
+
+    @property
+    def closed(self):
+        return bool(self.header[5])
+
+    # --- writer side ---
+
+    def begin_write(self):
+        # Returns (seq, slot view) so capture can decode straight into the ring.
+        seq = self.head
+        slot = seq % self.capacity
+        self.slot_seq[slot] = -1  # readers treat the slot as overwritten from here on
+        return seq, self.slots[slot]
+
+    def commit_write(self, seq, captured_at=None):
+        slot = seq % self.capacity
+        self.slot_time[slot] = time.monotonic() if captured_at is None else captured_at
+        self.slot_seq[slot] = seq
+        self.header[0] = seq + 1
+        return seq
+
+    def write(self, image, captured_at=None):
+        seq, view = self.begin_write()
+        view[...] = image
+        return self.commit_write(seq, captured_at)
+
+    # --- reader side ---
+
+    def valid(self, seq):
+        return int(self.slot_seq[seq % self.capacity]) == seq
+
+    def read(self, seq):
+        # Returns (frame view, captured_at); raises RingOverrun if the slot has
+        # already been reused and None if the frame is not written yet.
+        if seq >= self.head:
+            return None
+        slot = seq % self.capacity
+        if int(self.slot_seq[slot]) != seq:
+            raise RingOverrun(f"frame {seq} overwritten (head {self.head}, capacity {self.capacity})")
+        view = self.slots[slot]
+        view.flags.writeable = False
+        captured_at = float(self.slot_time[slot])
+        if int(self.slot_seq[slot]) != seq:
+            raise RingOverrun(f"frame {seq} overwritten while reading")
+        return view, captured_at
+
+    def close(self):
+        if self.owner:
+            self.header[5] = 1
+        # Drop our views before closing the mapping.
+        self.header = self.slot_seq = self.slot_time = self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    # cv.VideoCapture-like consumer, so visionNav and VisionPipeline can read
+    # from the ring directly. latest=True skips to the newest frame each read
+    # (vision); latest=False reads every frame in order and counts overruns
+    # (recorder).
+    def __init__(self, ring, latest=True, poll_interval=0.001, timeout=2.0):
+        self.ring = ring
+        self.latest = latest
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.next_seq = max(0, ring.head - 1) if latest else ring.head
+        self.last_seq = None
+        self.captured_at = None
+        self.overruns = 0
+        self._released = False
+
+    def isOpened(self):
+        return not self._released and self.ring.header is not None
+
+    def read(self):
+        deadline = time.monotonic() + self.timeout
+        while not self._released:
+            head = self.ring.head
+            if self.latest and head - 1 >= self.next_seq:
+                self.next_seq = head - 1
+            try:
+                item = self.ring.read(self.next_seq)
+            except RingOverrun:
+                oldest = max(0, self.ring.head - self.ring.capacity + 1)
+                self.overruns += oldest - self.next_seq
+                self.next_seq = oldest
+                continue
+            if item is not None:
+                frame, self.captured_at = item
+                self.last_seq = self.next_seq
+                self.next_seq += 1
+                return True, frame
+            if self.ring.closed or time.monotonic() > deadline:
+                break
+            time.sleep(self.poll_interval)
+        return False, None
+
+    def get(self, prop):
+        height, width = self.ring.shape[:2]
+        if prop == cv.CAP_PROP_FRAME_WIDTH:
+            return width
+        if prop == cv.CAP_PROP_FRAME_HEIGHT:
+            return height
+        return 0
+
+    def release(self):
+        self._released = True
+
+
+class CaptureService:
+    # Owns the camera and is the ring's only writer.
+    def __init__(self, video, ring):
+        self.video = video
+        self.ring = ring
+        self.frames = 0
+        self.failed = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def open(cls, video, name=None, capacity=8):
+        # Sizes the ring from the first frame.
+        ret, frame = video.read()
+        if not ret:
+            raise IOError("Could not read a first frame from the camera")
+        captured_at = getattr(video, "captured_at", None) or time.monotonic()
+        ring = FrameRing.create(name, capacity, frame.shape)
+        ring.write(frame, captured_at)
+        return cls(video, ring)
+
+    def _run(self):
+        while not self._stop.is_set() and self.video.isOpened():
+            seq, view = self.ring.begin_write()
+            ret, frame = self.video.read(view)
+            # Driver timestamp when the source has one (CameraCapture), else the time read() returned.
+            captured_at = getattr(self.video, "captured_at", None) or time.monotonic()
+            if not ret:
+                self.failed = True
+                break
+            if frame is not view:
+                # Backend did not decode in place. A frame of another size is
+                # scaled into the slot; one that cannot be (different channel
+                # count) stops the service rather than publishing the stale slot.
+                if frame.shape == view.shape:
+                    view[...] = frame
+                elif frame.ndim == view.ndim and frame.shape[2:] == view.shape[2:]:
+                    cv.resize(frame, (view.shape[1], view.shape[0]), dst=view, interpolation=cv.INTER_AREA)
+                else:
+                    print(f"[RING] Camera frame {frame.shape} does not fit the ring slots {view.shape}; stopping capture")
+                    self.failed = True
+                    break
+            self.ring.commit_write(seq, captured_at)
+            self.frames += 1
+        self.ring.header[5] = 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="capture-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.video.release()
@@ -0,0 +1,272 @@
+import argparse
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+
+import cv2 as cv
+import numpy as np
+
+from vision import HSV_PROFILE_PATH, SMOOTHING_MODES, DEFAULT_SMOOTHING, visionNav
+
+# Dockside HSV threshold calibration.
+#
+# Annotations are a CSV with columns frame,label,x,y,w,h where frame is the
+# frame index (video) or file name (image folder) and label is red or green:
+#   python hsv_calibrate.py --video heat1.mp4 --mark 30 --annotations heat1.csv   (mark boxes by hand)
+#   python hsv_calibrate.py --video heat1.mp4 --annotations heat1.csv              (writes hsv_profile.json)
+#   python hsv_calibrate.py --frames stills/ --mark 1 --annotations stills.csv     (mark every image)
+#
+# Frames are pre-filtered with visionNav's default smoothing, so the profile is
+# tuned on the same pixels it will classify; pass --smoothing if the boat runs
+# another mode (or none for raw frames). The bilateral modes are far too slow
+# to run on whole frames here, so only the marked boxes (plus the filter's
+# reach, which gives the same pixels as filtering the whole frame) and a
+# downscaled background sample are smoothed.
+#
+# Per channel it picks the range that maximises separation (share of buoy
+# pixels inside minus share of everything else inside), using cumulative
+# histograms so each channel is solved in one vectorized pass.
+
+BINS = {"h": 180, "s": 256, "v": 256}
+RED_HUE_SHIFT = 90  # red straddles hue 0/180; shift it into one contiguous range
+
+# smoothing mode -> (downscale, bilateral diameter) as in visionNav.prefilter
+REGION_SMOOTHING = {"bilateral": (1, 25), "bilateral_small": (2, 13)}
+
+
+def read_annotations(path):
+    boxes = defaultdict(list)
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            frame = row["frame"]
+            key = int(frame) if frame.isdigit() else frame
+            boxes[key].append((row["label"].strip().lower(), int(row["x"]), int(row["y"]), int(row["w"]), int(row["h"])))
+    return boxes
+
+
+def iter_frames(video=None, folder=None, wanted=None):
+    if video:
+        cap = cv.VideoCapture(video)
+        index = 0
+        last = max(wanted) if wanted else None
+        while cap.isOpened() and (last is None or index <= last):
+            if wanted is not None and index not in wanted:
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield index, frame
+            index += 1
+        cap.release()
+    else:
+        for name in sorted(os.listdir(folder)):
+            if wanted is not None and name not in wanted:
+                continue
+            frame = cv.imread(os.path.join(folder, name))
+            if frame is not None:
+                yield name, frame
+
+
+class HistogramSet:
+    def __init__(self):
+        self.hist = {label: {c: np.zeros(n, np.int64) for c, n in BINS.items()} for label in ("red", "green", "background")}
+
+    def add(self, label, hsv_pixels):
+        if not len(hsv_pixels):
+            return
+        hist = self.hist[label]
+        for i, channel in enumerate(("h", "s", "v")):
+            hist[channel] += np.bincount(hsv_pixels[:, i], minlength=BINS[channel])[:BINS[channel]]
+
+    def channel(self, label, channel):
+        # (buoy histogram, histogram of everything else: background + other buoy colour)
+        other = "green" if label == "red" else "red"
+        positive = self.hist[label][channel].astype(np.float64)
+        negative = (self.hist["background"][channel] + self.hist[other][channel]).astype(np.float64)
+        if label == "red" and channel == "h":
+            positive, negative = np.roll(positive, RED_HUE_SHIFT), np.roll(negative, RED_HUE_SHIFT)
+        return positive, negative
+
+
+def best_range(positive, negative):
+    # Maximise TPR(lo..hi) - FPR(lo..hi) over all intervals in O(bins).
+    pos = positive / max(positive.sum(), 1)
+    neg = negative / max(negative.sum(), 1)
+    gain = np.concatenate([[0.0], np.cumsum(pos - neg)])
+    running_min = np.minimum.accumulate(gain[:-1])
+    running_arg = np.zeros(len(running_min), np.int64)
+    is_new_min = gain[:-1] <= running_min
+    running_arg[is_new_min] = np.nonzero(is_new_min)[0]
+    running_arg = np.maximum.accumulate(running_arg)
+    scores = gain[1:] - running_min
+    hi = int(np.argmax(scores))
+    lo = int(running_arg[hi])
+    return lo, hi, float(scores[hi])
+
+
+def widen_range(lo, hi, negative, max_pad, tolerance=1e-4):
+    # Grow the range into neighbouring bins that hold (almost) no negatives, so
+    # a tight cluster from one session still tolerates small lighting changes.
+    neg = negative / max(negative.sum(), 1)
+    for _ in range(max_pad):
+        if lo > 0 and neg[lo - 1] <= tolerance:
+            lo -= 1
+        else:
+            break
+    for _ in range(max_pad):
+        if hi < len(neg) - 1 and neg[hi + 1] <= tolerance:
+            hi += 1
+        else:
+            break
+    return lo, hi
+
+
+def pick_thresholds(hists, pad=(8, 40, 40)):
+    # pad: most bins each range may grow by per channel (h, s, v)
+    profile = {"separation": {}}
+    for label in ("red", "green"):
+        ranges = {}
+        for channel, max_pad in zip(("h", "s", "v"), pad):
+            positive, negative = hists.channel(label, channel)
+            lo, hi, score = best_range(positive, negative)
+            ranges[channel] = widen_range(lo, hi, negative, max_pad)
+            profile["separation"][f"{label}_{channel}"] = round(score, 4)
+        (h_lo, h_hi), (s_lo, s_hi), (v_lo, v_hi) = ranges["h"], ranges["s"], ranges["v"]
+
+        if label == "green":
+            profile["green"] = {"lower": [h_lo, s_lo, v_lo], "upper": [h_hi, s_hi, v_hi]}
+            continue
+
+        # Undo the hue shift; a range crossing 180 becomes the usual two red ranges.
+        start, end = (h_lo - RED_HUE_SHIFT) % 180, (h_hi - RED_HUE_SHIFT) % 180
+        if start <= end:
+            first, second = (start, end), (start, end)
+        else:
+            first, second = (0, end), (start, 180)
+        profile["red"] = {
+            "lower1": [first[0], s_lo, v_lo], "upper1": [first[1], s_hi, v_hi],
+            "lower2": [second[0], s_lo, v_lo], "upper2": [second[1], s_hi, v_hi],
+        }
+    return profile
+
+
+def smooth_region(nav, frame, x0, y0, x1, y1, factor, diameter):
+    # nav.prefilter(frame) cropped to x0:x1, y0:y1 (at 1/factor scale), computed
+    # from that region plus the filter's reach instead of the whole frame.
+    margin = (diameter // 2 + 2) * factor  # + pyrDown's 5x5 kernel
+    height, width = frame.shape[:2]
+    ax0, ay0 = max(0, x0 - margin) // factor * factor, max(0, y0 - margin) // factor * factor
+    ax1, ay1 = min(width, x1 + margin), min(height, y1 + margin)
+    smoothed = nav.prefilter(frame[ay0:ay1, ax0:ax1])
+    return smoothed[(y0 - ay0) // factor:(y1 - ay0) // factor, (x0 - ax0) // factor:(x1 - ax0) // factor]
+
+
+def collect(frames, annotations, smoothing=None, inner=0.6, background_stride=4):
+    hists = HistogramSet()
+    nav = visionNav(smoothing=smoothing, profile=None) if smoothing else None
+    region = REGION_SMOOTHING.get(smoothing)
+    count = 0
+    for key, frame in frames:
+        boxes = annotations.get(key)
+        if not boxes:
+            continue
+        count += 1
+        height, width = frame.shape[:2]
+        full = frame
+        if nav is not None and region is None:
+            frame = nav.prefilter(frame)  # the pyramid modes are cheap on whole frames
+        scale = frame.shape[1] / width
+
+        if region is None:
+            sample = frame[::background_stride, ::background_stride]
+        else:
+            factor, diameter = region
+            sample = cv.resize(full, (width // background_stride, height // background_stride), interpolation=cv.INTER_AREA)
+            sample = cv.bilateralFilter(sample, max(3, diameter * factor // background_stride), 400, 400)
+        sample_scale = sample.shape[1] / width
+        outside = np.ones(sample.shape[:2], bool)
+
+        for label, x, y, w, h in boxes:
+            outside[max(0, int(y * sample_scale)):int(np.ceil((y + h) * sample_scale)),
+                    max(0, int(x * sample_scale)):int(np.ceil((x + w) * sample_scale))] = False
+            # Only the core of each box: corners of a box around a round buoy are water.
+            dx, dy = int(w * (1 - inner) / 2), int(h * (1 - inner) / 2)
+            x0, y0, x1, y1 = max(0, x + dx), max(0, y + dy), min(width, x + w - dx), min(height, y + h - dy)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            if region is None:
+                crop = frame[int(y0 * scale):int(y1 * scale), int(x0 * scale):int(x1 * scale)]
+            else:
+                crop = smooth_region(nav, full, x0, y0, x1, y1, *region)
+            if crop.size:
+                hists.add(label, cv.cvtColor(crop, cv.COLOR_BGR2HSV).reshape(-1, 3))
+
+        hists.add("background", cv.cvtColor(sample, cv.COLOR_BGR2HSV)[outside])
+    return hists, count
+
+
+def mark_frames(video, every, out_path, folder=None):
+    # Minimal marking UI: draw red boxes, Enter; then green boxes, Enter. Esc skips a frame.
+    # Every Nth video frame or image in folder is shown.
+    rows = []
+    for n, (index, frame) in enumerate(iter_frames(video, folder)):
+        if n % every:
+            continue
+        for label in ("red", "green"):
+            boxes = cv.selectROIs(f"Mark {label.upper()} buoys (frame {index})", frame, showCrosshair=False)
+            cv.destroyAllWindows()
+            for x, y, w, h in np.asarray(boxes).reshape(-1, 4):
+                rows.append((index, label, int(x), int(y), int(w), int(h)))
+    with open(out_path, "w", newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "label", "x", "y", "w", "h"])
+        writer.writerows(rows)
+    print(f"✅ {len(rows)} boxes saved to {out_path}")
+
+
+def calibrate(annotations_path, video=None, folder=None, smoothing=DEFAULT_SMOOTHING, output=HSV_PROFILE_PATH):
+    start = time.perf_counter()
+    annotations = read_annotations(annotations_path)
+    frames = iter_frames(video, folder, wanted=set(annotations))
+    hists, count = collect(frames, annotations, smoothing)
+    if count == 0:
+        raise SystemExit("No annotated frames found.")
+
+    profile = pick_thresholds(hists)
+    profile.update({
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": video or folder,
+        "frames": count,
+        "smoothing": smoothing,
+    })
+    with open(output, "w") as f:
+        json.dump(profile, f, indent=4)
+
+    print(f"✅ Calibrated on {count} frames in {time.perf_counter() - start:.1f}s -> {output}")
+    print(f"   red   {profile['red']}")
+    print(f"   green {profile['green']}")
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate buoy HSV thresholds from marked frames")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video")
+    source.add_argument("--frames", help="Folder of still images")
+    parser.add_argument("--annotations", required=True, help="CSV of frame,label,x,y,w,h")
+    parser.add_argument("--mark", type=int, default=None, metavar="N", help="Mark boxes on every Nth frame / image and save them to --annotations")
+    parser.add_argument("--smoothing", default=DEFAULT_SMOOTHING, choices=SMOOTHING_MODES + ("none",),
+                        help="Pre-filter used at runtime (default: visionNav's)")
+    parser.add_argument("--output", default=HSV_PROFILE_PATH)
+    args = parser.parse_args()
+
+    if args.mark is not None and args.mark < 1:
+        parser.error("--mark must be at least 1")
+    if args.mark:
+        mark_frames(args.video, args.mark, args.annotations, folder=args.frames)
+    else:
+        calibrate(args.annotations, args.video, args.frames, None if args.smoothing == "none" else args.smoothing, args.output)
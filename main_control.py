@@ -1,39 +1,41 @@
 from vision import visionNav
 from qgc_controller import QGCMissionController
-from pwm_controller import PWMController
+from pwm_controller import PWMController, STEERING_CHANNEL, THROTTLE_CHANNEL
 from mission_logger import MissionLogger
+from flight_recorder import FlightRecorder
+from pipeline import VisionPipeline, run_tracked
+from buoy_tracker import BuoyTracker
+from video_recorder import VideoRecorder
+from camera_capture import open_camera
 
 import cv2 as cv
 import time
 
 def main():
     logger = MissionLogger()
+    flight = FlightRecorder()  # structured per-decision records, see flight_recorder.py
     qgc = QGCMissionController('/dev/ttyACM0')   # Change port 
     pwm = PWMController('/dev/ttyACM0')          # Pixhawk port same as pwm commannds
     
     # CAMERA SETUP
-    # For USB webcam (most common on Pi): 
-    # For Pi Camera Module: make sure it's enabled and use OpenCV with libcamera/GStreamer
-    video = cv.VideoCapture(0) #use index 0 or 1
+    # For USB webcam (most common on Pi): V4L2 + MJPG at the processing size, 1-frame buffer
+    # For Pi Camera Module: make sure it's enabled and use backend="libcamera" (GStreamer)
+    video = open_camera(0, backend="auto", width=640, height=480) #use index 0 or 1
 
     vision = visionNav(video=video)
-    logger.log("✅ Main system started")
-
-    while video.isOpened():
-        ret, frame = video.read()
-        if not ret:
-            break
+    tracker = BuoyTracker(vision, full_every=10)  # full-frame search every 10th frame, ROI search in between
 
-        vision.image = frame
-        vision.generate_masks()
-        vision.detect_buoys()
+    # Debrief recording: every 2nd annotated frame at 640x480, encoded off the control loop
+    recorder = VideoRecorder(time.strftime("recordings/mission_%Y%m%d_%H%M%S.mp4"), fps=30, size=(640, 480), every=2).start()
+    logger.log("✅ Main system started")
 
+    def actuate(frame, result):
         decision = ""  # Your vision-based maneuvering decision
-        x_red = vision.middle_x
-        x_green = vision.middle_x
-        frame_center = vision.width // 2 if vision.width else 320
+        x_red = result.middle_x
+        x_green = result.middle_x
+        frame_center = result.width // 2 if result.width else 320
 
-        if vision.mask_r is not None and vision.mask_g is not None:
+        if result.has_masks:
             if abs(x_red - frame_center) < 50 and abs(x_green - frame_center) < 50:
                 decision = "KEEP_ROUTE"
             elif x_red > x_green:
@@ -45,10 +47,14 @@ def main():
         else:
             decision = "KEEP_ROUTE"
 
-        logger.log(f"📷 Vision: {decision}")
+        logger.log(f"📷 Vision: {decision} ({frame.age() * 1000:.0f} ms)")
+
+        def record_flight():
+            flight.record(frame.seq, result.detection, decision, pwm.output.get(STEERING_CHANNEL),
+                          pwm.output.get(THROTTLE_CHANNEL), qgc.telemetry, t=frame.captured_at)
 
         if decision == "KEEP_ROUTE":
-            pass  # QGC mission continues
+            record_flight()  # QGC mission continues
 
         elif decision in ["TURN_LEFT", "TURN_RIGHT", "TURN_AROUND"]:
             qgc.pause_mission()
@@ -67,16 +73,32 @@ def main():
                 pwm.steer_right()
                 logger.log("🔁 Turn around sequence")
 
+            record_flight()
+
             time.sleep(2)
             pwm.stop_all()
+            pwm.neutral()  # hand the sticks back while the mission runs
             logger.log("⛔ Manual override stopped")
 
             qgc.resume_mission()
             logger.log("▶️ QGC mission resumed")
 
-        cv.imshow("Live Vision", vision.image)
-        if cv.waitKey(1) & 0xFF == ord('q'):
-            break
+        recorder.submit(result.image)
+        cv.imshow("Live Vision", result.image)
+        return not (cv.waitKey(1) & 0xFF == ord('q'))
+
+    # Capture, vision and actuation run as separate stages; stale frames are dropped
+    pipeline = VisionPipeline(video, lambda frame: run_tracked(tracker, frame), actuate)
+    try:
+        stats = pipeline.run()
+    finally:
+        pwm.stop_all()
+        pwm.close()  # the final STOP and the override release are on the wire before exit
+    logger.log(f"📊 Pipeline stats: {stats}")
+    logger.log(f"🎥 Recorder stats: {recorder.close()}")
+    logger.log(f"📷 Camera stats: {video.stats()}")
+    logger.log(f"📡 MAVLink command stats: {qgc.hub.commands.stats()}")
+    flight.close()
 
     video.release()
     cv.destroyAllWindows()
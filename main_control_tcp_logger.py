@@ -1,64 +1,56 @@
 from vision import visionNav
 from qgc_controller import QGCMissionController
-from pwm_controller import PWMController
+from pwm_controller import PWMController, STEERING_CHANNEL, THROTTLE_CHANNEL
 from mission_logger import MissionLogger
+from flight_recorder import FlightRecorder
+from pipeline import VisionPipeline, run_vision
+from preview_streamer import PreviewStreamer
+from camera_capture import open_camera
+from tcp_uplink import TcpUplink
 
 import cv2 as cv
 import time
-import socket
 import logging
 
 # === TCP LOGGER CONFIG ===
 TCP_IP = '172.16.21.153'   # 🛠️ Replace with your laptop IP
 TCP_PORT = 9999
+BOAT_ID = "boat1"          # name of this boat's log on the base station
+PREVIEW_PORT = 8080        # MJPEG preview at http://<boat-ip>:8080/ (None to disable)
 
 # === SETUP LOCAL LOGGER ===
 logging.basicConfig(filename="local_tcp_log.txt", level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
-# === ATTEMPT TCP CONNECTION ===
-try:
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.connect((TCP_IP, TCP_PORT))
-    logging.info("✅ TCP connection to base station established")
-except Exception as e:
-    logging.error(f"❌ TCP connection failed: {e}")
-    sock = None
+# === TCP UPLINK ===
+# Lines are buffered and sent by a background thread, which keeps reconnecting
+# (with backoff) and replays what was buffered while the link was down.
+uplink = TcpUplink(TCP_IP, TCP_PORT, boat_id=BOAT_ID)
 
 def send_log(message):
     logging.info(message)
     print(message)
-    if sock:
-        try:
-            sock.sendall((message + '\n').encode())
-        except Exception as e:
-            logging.error(f"❌ TCP send failed: {e}")
+    uplink.send(message)
 
 def main():
+    uplink.start()
     logger = MissionLogger()
+    flight = FlightRecorder()  # structured per-decision records, see flight_recorder.py
     qgc = QGCMissionController('/dev/ttyACM0')
     pwm = PWMController('/dev/ttyACM0')
 
-    video = cv.VideoCapture(0)
+    video = open_camera(0, width=640, height=480)
     vision = visionNav(video=video)
+    preview = PreviewStreamer(port=PREVIEW_PORT).start() if PREVIEW_PORT else None
 
     send_log("🚀 [TCP LOGGER] Main system started")
 
-    while video.isOpened():
-        ret, frame = video.read()
-        if not ret:
-            send_log("⚠️ Frame read failed, exiting loop.")
-            break
-
-        vision.image = frame
-        vision.generate_masks()
-        vision.detect_buoys()
-
+    def actuate(frame, result):
         decision = ""
-        x_red = vision.middle_x
-        x_green = vision.middle_x
-        frame_center = vision.width // 2 if vision.width else 320
+        x_red = result.middle_x
+        x_green = result.middle_x
+        frame_center = result.width // 2 if result.width else 320
 
-        if vision.mask_r is not None and vision.mask_g is not None:
+        if result.has_masks:
             if abs(x_red - frame_center) < 50 and abs(x_green - frame_center) < 50:
                 decision = "KEEP_ROUTE"
             elif x_red > x_green:
@@ -70,11 +62,15 @@ def main():
         else:
             decision = "KEEP_ROUTE"
 
-        send_log(f"📷 Vision Decision: {decision}")
+        send_log(f"📷 Vision Decision: {decision} ({frame.age() * 1000:.0f} ms)")
         logger.log(f"📷 Vision Decision: {decision}")
 
+        def record_flight():
+            flight.record(frame.seq, result.detection, decision, pwm.output.get(STEERING_CHANNEL),
+                          pwm.output.get(THROTTLE_CHANNEL), qgc.telemetry, t=frame.captured_at)
+
         if decision == "KEEP_ROUTE":
-            pass
+            record_flight()
 
         elif decision in ["TURN_LEFT", "TURN_RIGHT", "TURN_AROUND"]:
             qgc.pause_mission()
@@ -92,24 +88,43 @@ def main():
                 pwm.steer_right()
                 send_log("🔁 Turn around")
 
+            record_flight()
+
             time.sleep(2)
             pwm.stop_all()
+            pwm.neutral()  # hand the sticks back while the mission runs
             send_log("⛔ Manual override stopped")
 
             qgc.resume_mission()
             send_log("▶️ QGC mission resumed")
 
-        cv.imshow("Live Vision", vision.image)
-        if cv.waitKey(1) & 0xFF == ord('q'):
-            break
+        if preview:
+            preview.publish(result.image)
+        cv.imshow("Live Vision", result.image)
+        return not (cv.waitKey(1) & 0xFF == ord('q'))
+
+    pipeline = VisionPipeline(video, lambda frame: run_vision(vision, frame), actuate)
+    try:
+        stats = pipeline.run()
+    finally:
+        pwm.stop_all()
+        pwm.close()  # the final STOP and the override release are on the wire before exit
+    if pipeline.capture_failed:
+        send_log("⚠️ Frame read failed, exiting loop.")
+    send_log(f"📊 Pipeline stats: {stats}")
+    send_log(f"📷 Camera stats: {video.stats()}")
+    send_log(f"📡 MAVLink command stats: {qgc.hub.commands.stats()}")
+    flight.close()
+    if preview:
+        send_log(f"📡 Preview stats: {preview.stats()}")
+        preview.stop()
 
     video.release()
     cv.destroyAllWindows()
     logger.save_to_file("mission_log.txt")
     send_log("✅ Mission complete. Logs saved.")
 
-    if sock:
-        sock.close()
+    logging.info(f"📡 Uplink stats: {uplink.close()}")
 
 if __name__ == "__main__":
     main()
@@ -6,8 +6,8 @@ import sys
 import os
 import csv
 import json
-import shutil
 import subprocess
+import time
 import cv2 as cv
 import threading
 from PyQt5.QtWidgets import (
@@ -19,6 +19,16 @@ from vision import visionNav
 from qgc_controller import QGCMissionController
 from pwm_controller import PWMController
 from mission_logger import MissionLogger
+from pipeline import VisionPipeline, run_vision
+from camera_capture import open_camera
+from mavlink_hub import MavlinkHub
+from startup import Startup, StartupError
+from command_queue import CommandFailed
+
+MAVLINK_PORT = '/dev/ttyACM0'  # Change port if needed
+CAMERA_INDEX = 0  # Change if webcam index differs
+QGC_APPIMAGE = os.path.expanduser("~/e_club/qgroundcontrol_py/QGroundControl.AppImage")
+LAUNCH_QGC = True  # QGroundControl for monitoring only; the mission goes up over MAVLink
 
 class QGCMissionApp(QMainWindow):
     def __init__(self):
@@ -41,6 +51,9 @@ class QGCMissionApp(QMainWindow):
         self.logger = None
         self.vision = None
         self.video = None
+        self.vision_thread = None
+        self.started_at = None
+        self.first_control_at = None
 
     def select_csv(self):
         csv_path, _ = QFileDialog.getOpenFileName(self, "Select CSV File", "", "CSV Files (*.csv)")
@@ -53,22 +66,16 @@ class QGCMissionApp(QMainWindow):
         plan_save_path = os.path.join(plan_dir, "mission_auto.plan")
 
         try:
-            self.convert_csv_to_plan(csv_path, plan_save_path)
-
-            autoload_dir = os.path.expanduser("~/e_club/qgroundcontrol_py/qgc_autoload")
-            os.makedirs(autoload_dir, exist_ok=True)
-            shutil.copy(plan_save_path, os.path.join(autoload_dir, "AutoLoad.plan"))
-
-            # Launch QGroundControl asynchronously
-            subprocess.Popen([
-                "bash", "-c",
-                f"cd ~/e_club/qgroundcontrol_py && ./QGroundControl.AppImage & sleep 5 && bash {autoload_dir}/launch_qgc.sh"
-            ])
-
-            QMessageBox.information(self, "Success", "QGC Launched and Mission Auto-loaded.\nStarting vision control...")
+            if self.vision_thread is not None and self.vision_thread.is_alive():
+                # Already running: only the edited waypoints go up again.
+                self.convert_csv_to_plan(csv_path, plan_save_path)
+                result = self.qgc.upload_mission(plan_save_path)
+            else:
+                result = self.start_mission_control(csv_path, plan_save_path)
 
-            # Now initialize Pixhawk and vision after GUI response
-            self.start_mission_control()
+            QMessageBox.information(self, "Success",
+                                    f"Mission uploaded ({result.sent}/{result.total} items in {result.elapsed * 1000:.0f} ms).\n"
+                                    "Vision control running.")
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed: {str(e)}")
@@ -116,81 +123,134 @@ class QGCMissionApp(QMainWindow):
         with open(plan_path, "w") as f:
             json.dump(plan, f, indent=4)
 
-    def start_mission_control(self):
+    # --- startup steps (run concurrently by start_mission_control) ---
+
+    def warm_up_camera(self):
+        video = open_camera(CAMERA_INDEX, width=640, height=480)
+        for _ in range(3):  # first frames carry driver/exposure start-up delay
+            video.read()
+        self.vision = visionNav(video=video)
+        self.video = video
+        return video
+
+    def connect_mavlink(self):
+        hub = MavlinkHub.shared(MAVLINK_PORT, heartbeat_timeout=15)
+        self.qgc = QGCMissionController(hub=hub)
+        return hub
+
+    def arm(self):
+        self.pwm = PWMController(hub=self.qgc.hub)
+        return self.pwm
+
+    def abort_startup(self, startup):
+        # A failed startup must not leave an armed vehicle that nothing controls.
+        if self.pwm is not None:
+            self.pwm.stop_all()
+            self.pwm.close()
+            self.pwm = None
+        arm_started = any(r.name == "arm" and r.started is not None for r in startup.results())
+        if arm_started and self.qgc is not None:
+            try:
+                self.qgc.hub.disarm()
+                self.logger.log("Startup failed: vehicle disarmed.")
+            except (CommandFailed, TimeoutError) as e:
+                self.logger.log(f"Startup failed and disarming failed too: {e}")
+
+    def launch_qgc(self):
+        if not os.path.exists(QGC_APPIMAGE):
+            raise FileNotFoundError(QGC_APPIMAGE)
+        return subprocess.Popen([QGC_APPIMAGE], cwd=os.path.dirname(QGC_APPIMAGE))
+
+    def start_mission_control(self, csv_path, plan_path):
+        # Camera, MAVLink (+ mission upload) and QGC start together; arming
+        # comes last, once everything it needs is ready, and vision control
+        # begins as soon as every required step is done.
+        self.logger = self.logger or MissionLogger()
+        self.started_at = time.monotonic()
+        startup = Startup()
+        startup.step("plan", lambda: self.convert_csv_to_plan(csv_path, plan_path), timeout=5)
+        startup.step("camera", self.warm_up_camera, timeout=10)
+        startup.step("mavlink", self.connect_mavlink, timeout=20)
+        startup.step("arm", self.arm, after=["camera", "mavlink", "upload"], timeout=15)
+        startup.step("upload", lambda: self.qgc.upload_mission(plan_path), after=["plan", "mavlink"], timeout=15)
+        if LAUNCH_QGC:
+            startup.step("qgc", self.launch_qgc, required=False)
         try:
-            self.qgc = QGCMissionController('/dev/ttyACM0')  # Change port if needed
-            self.pwm = PWMController('/dev/ttyACM0')
-            self.logger = MissionLogger()
-            self.video = cv.VideoCapture(0)  # Change if webcam index differs
-            self.vision = visionNav(video=self.video)
-            self.logger.log("Mission control started.")
-
-            # Run vision loop in a separate thread to keep GUI responsive
-            vision_thread = threading.Thread(target=self.run_vision_loop, daemon=True)
-            vision_thread.start()
-
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to start mission control: {str(e)}")
-
-    def run_vision_loop(self):
-        while self.video.isOpened():
-            ret, frame = self.video.read()
-            if not ret:
-                break
-
-            self.vision.image = frame
-            self.vision.generate_masks()
-            self.vision.detect_buoys()
-
-            decision = ""
-            x_red = self.vision.middle_x or 0
-            x_green = self.vision.middle_x or 0
-            frame_center = self.vision.width // 2 if self.vision.width else 320
-
-            if self.vision.mask_r is not None and self.vision.mask_g is not None:
-                if abs(x_red - frame_center) < 50 and abs(x_green - frame_center) < 50:
-                    decision = "KEEP_ROUTE"
-                elif x_red > x_green:
-                    decision = "TURN_LEFT"
-                elif x_green > x_red:
-                    decision = "TURN_RIGHT"
-                else:
-                    decision = "TURN_AROUND"
-            else:
+            startup.run(on_wait=QApplication.processEvents)  # keeps the window responsive
+        except StartupError:
+            self.abort_startup(startup)
+            raise
+        finally:
+            self.logger.log(startup.report())
+
+        self.logger.log("Mission control started.")
+        # Run vision loop in a separate thread to keep GUI responsive
+        self.vision_thread = threading.Thread(target=self.run_vision_loop, daemon=True)
+        self.vision_thread.start()
+        return startup.value("upload")
+
+    def actuate(self, frame, result):
+        if self.first_control_at is None:
+            self.first_control_at = time.monotonic()
+            self.logger.log(f"First control frame {self.first_control_at - self.started_at:.2f}s after start.")
+        decision = ""
+        x_red = result.middle_x or 0
+        x_green = result.middle_x or 0
+        frame_center = result.width // 2 if result.width else 320
+
+        if result.has_masks:
+            if abs(x_red - frame_center) < 50 and abs(x_green - frame_center) < 50:
                 decision = "KEEP_ROUTE"
+            elif x_red > x_green:
+                decision = "TURN_LEFT"
+            elif x_green > x_red:
+                decision = "TURN_RIGHT"
+            else:
+                decision = "TURN_AROUND"
+        else:
+            decision = "KEEP_ROUTE"
 
-            self.logger.log(f"Vision decision: {decision}")
+        self.logger.log(f"Vision decision: {decision}")
 
-            if decision == "KEEP_ROUTE":
-                pass  # Let QGC continue
+        if decision == "KEEP_ROUTE":
+            pass  # Let QGC continue
 
-            elif decision in ["TURN_LEFT", "TURN_RIGHT", "TURN_AROUND"]:
-                self.qgc.pause_mission()
-                self.logger.log("QGC mission paused.")
+        elif decision in ["TURN_LEFT", "TURN_RIGHT", "TURN_AROUND"]:
+            self.qgc.pause_mission()
+            self.logger.log("QGC mission paused.")
 
-                if decision == "TURN_LEFT":
-                    self.pwm.steer_left()
-                    self.logger.log("Steering LEFT.")
+            if decision == "TURN_LEFT":
+                self.pwm.steer_left()
+                self.logger.log("Steering LEFT.")
 
-                elif decision == "TURN_RIGHT":
-                    self.pwm.steer_right()
-                    self.logger.log("Steering RIGHT.")
+            elif decision == "TURN_RIGHT":
+                self.pwm.steer_right()
+                self.logger.log("Steering RIGHT.")
 
-                elif decision == "TURN_AROUND":
-                    self.pwm.steer_left()
-                    self.pwm.steer_right()
-                    self.logger.log("Performing TURN_AROUND sequence.")
+            elif decision == "TURN_AROUND":
+                self.pwm.steer_left()
+                self.pwm.steer_right()
+                self.logger.log("Performing TURN_AROUND sequence.")
 
-                cv.waitKey(2000)  # Wait 2 seconds for maneuver
-                self.pwm.stop_all()
-                self.logger.log("Stopped manual override.")
+            cv.waitKey(2000)  # Wait 2 seconds for maneuver
+            self.pwm.stop_all()
+            self.pwm.neutral()  # hand the sticks back while the mission runs
+            self.logger.log("Stopped manual override.")
 
-                self.qgc.resume_mission()
-                self.logger.log("QGC mission resumed.")
+            self.qgc.resume_mission()
+            self.logger.log("QGC mission resumed.")
 
-            cv.imshow("Boat Vision", self.vision.image)
-            if cv.waitKey(1) & 0xFF == ord('q'):
-                break
+        cv.imshow("Boat Vision", result.image)
+        return not (cv.waitKey(1) & 0xFF == ord('q'))
+
+    def run_vision_loop(self):
+        pipeline = VisionPipeline(self.video, lambda frame: run_vision(self.vision, frame), self.actuate)
+        try:
+            stats = pipeline.run()
+        finally:
+            self.pwm.stop_all()
+            self.pwm.close()
+        self.logger.log(f"Pipeline stats: {stats}")
 
         self.video.release()
         cv.destroyAllWindows()
@@ -4,6 +4,7 @@ import cv2
 import tkinter as tk
 from tkinter import filedialog
 from vision import visionNav
+from camera_capture import open_camera
 from pwm_controller import PWMController
 from qgc_plan_converter import convert_csv_to_plan
 from mission_logger import MissionLogger
@@ -12,6 +13,7 @@ from dronekit import VehicleMode
 
 # === CONFIG ===
 CAMERA_INDEX = 0
+CAMERA_BACKEND = "auto"  # "libcamera" for the Pi camera module
 MAVLINK_UDP = "udp:127.0.0.1:14551"
 PLAN_OUTPUT = "mission.plan"
 LOG_FILE_PATH = "mission_log.txt"
@@ -80,8 +82,9 @@ def main():
 
     launch_qgc_flatpak()
 
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    if not cap.isOpened():
+    try:
+        cap = open_camera(CAMERA_INDEX, CAMERA_BACKEND, width=640, height=480)
+    except IOError:
         print("❌ Failed to open camera.")
         exit(1)
 
@@ -127,6 +130,7 @@ def main():
         cap.release()
         cv2.destroyAllWindows()
         pwm.stop_all()
+        pwm.close()
         pwm.vehicle.armed = False
         logger.log("Mission ended")
         logger.save_to_file(LOG_FILE_PATH)
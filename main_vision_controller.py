@@ -3,6 +3,7 @@ import os
 import time
 import cv2
 from vision import visionNav
+from camera_capture import open_camera
 from qgc_controller import pause_mission, resume_mission
 from pwm_controller import PWMController
 from qgc_plan_converter import convert_csv_to_plan
@@ -10,6 +11,7 @@ from mission_logger import MissionLogger
 
 # === CONFIG ===
 CAMERA_INDEX = 0
+CAMERA_BACKEND = "auto"  # "libcamera" for the Pi camera module
 SERIAL_PORT = "/dev/ttyACM0"
 PLAN_OUTPUT = "mission.plan"
 LOG_FILE_PATH = "mission_log.txt"
@@ -72,8 +74,9 @@ def main():
 
     launch_qgc()
 
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    if not cap.isOpened():
+    try:
+        cap = open_camera(CAMERA_INDEX, CAMERA_BACKEND, width=640, height=480)
+    except IOError:
         print("❌ Failed to open webcam.")
         exit(1)
 
@@ -104,6 +107,7 @@ def main():
         cap.release()
         cv2.destroyAllWindows()
         pwm.stop_all()
+        pwm.close()
         logger.log(" Mission ended")
         logger.save_to_file(LOG_FILE_PATH)
 
@@ -3,13 +3,16 @@ import time
 import cv2
 import tkinter as tk
 from tkinter import filedialog
-from vision import visionNav
+from vision import visionNav, decide
+from camera_capture import open_camera
 from pwm_controller import PWMController
 from qgc_plan_converter import convert_csv_to_plan
 from mission_logger import MissionLogger
+from pipeline import VisionPipeline, VisionSnapshot, run_vision
 
 # === CONFIG ===
 CAMERA_INDEX = 0
+CAMERA_BACKEND = "auto"  # "libcamera" for the Pi camera module
 MAVLINK_UDP = "udp:127.0.0.1:14551"
 PLAN_OUTPUT = "mission.plan"
 LOG_FILE_PATH = "mission_log.txt"
@@ -30,17 +33,10 @@ def ask_for_csv_path():
     print(f"✅ Selected file: {file_path}")
     return file_path
 
-def interpret_decision(nav: visionNav):
-    if nav.mask_r is None or nav.mask_g is None or nav.middle_x is None:
+def interpret_decision(result: VisionSnapshot):
+    if not result.has_masks:
         return "TURN_AROUND"
-    middle_of_frame = nav.width // 2
-    midpoint = nav.middle_x
-    if abs(midpoint - middle_of_frame) < nav.width * 0.1:
-        return "KEEP_ROUTE"
-    elif midpoint < middle_of_frame:
-        return "TURN_LEFT"
-    else:
-        return "TURN_RIGHT"
+    return decide(result.detection)
 
 def handle_decision(decision, pwm: PWMController):
     logger.log(f" Decision: {decision}")
@@ -68,38 +64,37 @@ def main():
     else:
         logger.log("⚠️ No CSV path provided. Continuing without mission plan.")
 
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    if not cap.isOpened():
+    try:
+        cap = open_camera(CAMERA_INDEX, CAMERA_BACKEND, width=640, height=480)
+    except IOError:
         print("❌ Failed to open camera.")
         exit(1)
 
     nav = visionNav(video=cap)
     pwm = PWMController(MAVLINK_UDP)
 
-    try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+    def actuate(frame, result):
+        decision = interpret_decision(result)
+        handle_decision(decision, pwm)
 
-            nav.image = frame
-            nav.generate_masks()
-            nav.detect_buoys()
+        cv2.imshow("VisionNav Debug", result.image)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            return False
 
-            decision = interpret_decision(nav)
-            handle_decision(decision, pwm)
+        time.sleep(0.2)
+        return True
 
-            cv2.imshow("VisionNav Debug", nav.image)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-
-            time.sleep(0.2)
+    try:
+        pipeline = VisionPipeline(cap, lambda frame: run_vision(nav, frame), actuate)
+        stats = pipeline.run()
+        logger.log(f"Pipeline stats: {stats}")
     except KeyboardInterrupt:
         print("\n🛑 Mission interrupted by user.")
     finally:
         cap.release()
         cv2.destroyAllWindows()
         pwm.stop_all()
+        pwm.close()
         logger.log(" Mission ended")
         logger.save_to_file(LOG_FILE_PATH)
 
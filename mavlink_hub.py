@@ -0,0 +1,199 @@
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+
+from pymavlink import mavutil
+
+from command_queue import CommandQueue
+
+# One MAVLink link per port, shared by every controller in the process. A
+# single reader thread owns recv and hands each message to the subscribers of
+# its type; all outgoing messages go through one send queue and one writer.
+#
+#   hub = MavlinkHub.shared('/dev/ttyACM0')          # same object for every caller of that port
+#   hub.subscribe('HEARTBEAT', lambda msg: ...)       # runs on the reader thread, keep it short
+#   hub.commands.submit(mavutil.mavlink.MAV_CMD_DO_SET_SERVO, 1, 1500)   # Future of the COMMAND_ACK
+#   msg = hub.wait_for('COMMAND_ACK', lambda m: m.command == ..., timeout=1.0)
+#
+# PWMController and QGCMissionController both build on this, so creating
+# both for '/dev/ttyACM0' opens the port and waits for a heartbeat once.
+
+ANY = "*"  # subscribe to every message type
+
+
+class MavlinkHub:
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, connection_str='/dev/ttyACM0', baud=57600, heartbeat_timeout=None):
+        self.connection_str = connection_str
+        print(f"[MAV] Connecting to {connection_str}...")
+        self.master = mavutil.mavlink_connection(connection_str, baud=baud)
+        # Handshake once, before the reader thread owns the link.
+        if self.master.wait_heartbeat(timeout=heartbeat_timeout) is None:
+            self.master.close()
+            raise ConnectionError(f"No heartbeat on {connection_str}")
+        print(f"[MAV] Heartbeat from system {self.master.target_system}, component {self.master.target_component}")
+
+        self.received = Counter()
+        self.sent = 0
+        self.latest = {}  # last message of each type
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._outbox = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+        for target, name in ((self._read_loop, "mavlink-reader"), (self._send_loop, "mavlink-sender")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        self.commands = CommandQueue(self)  # ACK-matched command_long, see command_queue.py
+
+    @classmethod
+    def shared(cls, connection_str='/dev/ttyACM0', baud=57600, heartbeat_timeout=None):
+        with cls._shared_lock:
+            hub = cls._shared.get(connection_str)
+            if hub is None or hub.closed:
+                hub = cls(connection_str, baud, heartbeat_timeout)
+                cls._shared[connection_str] = hub
+            return hub
+
+    @property
+    def closed(self):
+        return self._stop.is_set()
+
+    @property
+    def mav(self):
+        # Encoder only (*_encode); sending must go through send().
+        return self.master.mav
+
+    # --- receiving ---
+
+    def subscribe(self, msg_type, callback):
+        # callback(msg) runs on the reader thread. Returns a handle for unsubscribe().
+        with self._lock:
+            self._subscribers[msg_type].append(callback)
+        return msg_type, callback
+
+    def unsubscribe(self, handle):
+        msg_type, callback = handle
+        with self._lock:
+            try:
+                self._subscribers[msg_type].remove(callback)
+            except ValueError:
+                pass
+
+    def wait_for(self, msg_type, condition=None, timeout=None):
+        # Next message of msg_type (matching condition) or None on timeout.
+        done = threading.Event()
+        found = []
+
+        def on_message(msg):
+            if not found and (condition is None or condition(msg)):
+                found.append(msg)
+                done.set()
+
+        handle = self.subscribe(msg_type, on_message)
+        try:
+            done.wait(timeout)
+        finally:
+            self.unsubscribe(handle)
+        return found[0] if found else None
+
+    def _read_loop(self):
+        while not self._stop.is_set():
+            try:
+                msg = self.master.recv_match(blocking=True, timeout=0.5)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"[MAV] Read error: {e}")
+                time.sleep(0.1)
+                continue
+            if msg is None:
+                continue
+            msg_type = msg.get_type()
+            if msg_type == "BAD_DATA":
+                continue
+            self.received[msg_type] += 1
+            self.latest[msg_type] = msg
+            with self._lock:
+                callbacks = self._subscribers.get(msg_type, []) + self._subscribers.get(ANY, [])
+            for callback in callbacks:
+                try:
+                    callback(msg)
+                except Exception as e:
+                    print(f"[MAV] Subscriber for {msg_type} failed: {e}")
+
+    # --- sending ---
+
+    def send(self, msg):
+        # Queue an encoded message (hub.mav.<name>_encode(...)); never blocks.
+        self._outbox.put(msg)
+
+    def command_long(self, command, *params, confirmation=0):
+        # Raw send, no ACK tracking; use self.commands.submit() for that.
+        params = (list(params) + [0] * 7)[:7]
+        self.send(self.mav.command_long_encode(
+            self.master.target_system, self.master.target_component, command, confirmation, *params))
+
+    def backlog(self):
+        # Messages queued but not yet written; a rough measure of link congestion.
+        return self._outbox.unfinished_tasks
+
+    def flush(self, timeout=1.0):
+        # Wait until everything queued so far has been written.
+        deadline = time.monotonic() + timeout
+        while self._outbox.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return not self._outbox.unfinished_tasks
+
+    def _send_loop(self):
+        while True:
+            msg = self._outbox.get()
+            try:
+                if msg is None:
+                    break
+                self.master.mav.send(msg)
+                self.sent += 1
+            except Exception as e:
+                print(f"[MAV] Send failed: {e}")
+            finally:
+                self._outbox.task_done()
+
+    # --- vehicle helpers ---
+
+    def arm(self, timeout=10.0):
+        # Sends the arm command, then waits for a heartbeat with the armed flag.
+        # Raises CommandFailed if the vehicle rejects the command (e.g. a failed
+        # pre-arm check) and TimeoutError if it is not armed within timeout seconds.
+        return self._set_armed(True, timeout)
+
+    def disarm(self, timeout=10.0):
+        # Same as arm(), for the disarmed state.
+        return self._set_armed(False, timeout)
+
+    def _set_armed(self, armed, timeout):
+        deadline = time.monotonic() + timeout
+        ack = self.commands.submit(mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 1 if armed else 0)
+        ack.result(timeout=timeout)
+        if bool(self.master.motors_armed()) == armed:
+            return True
+        remaining = max(0.0, deadline - time.monotonic())
+        if self.wait_for("HEARTBEAT", lambda msg: bool(self.master.motors_armed()) == armed, remaining) is None:
+            raise TimeoutError(f"Vehicle not {'armed' if armed else 'disarmed'} after {timeout:.0f}s")
+        return True
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self.flush()
+        self._stop.set()
+        self._outbox.put(None)
+        for t in self._threads:
+            t.join(timeout=2)
+        self.master.close()
+        with MavlinkHub._shared_lock:
+            if MavlinkHub._shared.get(self.connection_str) is self:
+                del MavlinkHub._shared[self.connection_str]
@@ -1,19 +1,164 @@
+import atexit
+import os
+import queue
+import threading
 import time
+from collections import deque
+
+# log() only timestamps the line, keeps it in a fixed-size ring of recent
+# lines and queues it; a writer thread prints and streams queued lines to disk
+# in batches, fsyncs at least every fsync_interval seconds (a crash loses at
+# most that much), and rotates the file by size and/or age (file -> file.1 -> ...).
+#
+#   logger = MissionLogger()                       # streams to logs/mission_<date>_<time>.log
+#   logger.log("📷 Vision: KEEP_ROUTE")             # never blocks on the terminal or disk
+#   logger.get_logs()                              # recent lines (last `capacity`)
+#   logger.save_to_file("mission_log.txt")         # snapshot of the recent lines
+#   logger.close()                                 # flush + stop (also done at exit)
+
+DEFAULT_LOG_PATH = os.path.join("logs", "mission_%Y%m%d_%H%M%S.log")
+
 
 class MissionLogger:
-    def __init__(self):
-        self.logs = []
+    def __init__(self, path=DEFAULT_LOG_PATH, capacity=2000, echo=True, queue_size=10000, batch_size=256,
+                 fsync_interval=1.0, max_bytes=5 * 1024 * 1024, rotate_seconds=None, backups=5):
+        self.logs = deque(maxlen=capacity)
+        self.path = time.strftime(path) if path else None  # None keeps everything in memory only
+        self.echo = echo
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+
+        self.dropped = 0
+        self.written = 0
+        self.rotations = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = None
+        self._thread = threading.Thread(target=self._run, name="mission-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
 
     def log(self, message):
         timestamp = time.strftime("[%H:%M:%S]")
         log_entry = f"{timestamp} {message}"
-        print(log_entry)
         self.logs.append(log_entry)
+        try:
+            self._queue.put_nowait(log_entry)
+        except queue.Full:
+            self.dropped += 1  # writer is far behind; the ring still has the line
 
     def get_logs(self):
-        return self.logs
+        return list(self.logs)
 
     def save_to_file(self, path="mission_log.txt"):
+        # Writes the recent lines; the full mission is in the streamed log (self.path).
+        self.flush()
         with open(path, "w") as f:
-            for entry in self.logs:
+            for entry in list(self.logs):
                 f.write(entry + "\n")
+
+    def flush(self, timeout=5.0):
+        # Waits until everything logged so far is written (and fsynced).
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    # --- writer thread ---
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def _sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _write(self, lines):
+        if self.echo:
+            print("\n".join(lines), flush=True)
+        if not self.path:
+            return
+        try:
+            if self._file is None:
+                self._open()
+            self._file.write("\n".join(lines) + "\n")
+            self.written += len(lines)
+            too_big = self.max_bytes and self._file.tell() >= self.max_bytes
+            too_old = self.rotate_seconds and time.monotonic() - self._opened_at >= self.rotate_seconds
+            if too_big or too_old:
+                self._rotate()
+        except OSError as e:
+            print(f"[LOG] Could not write {self.path}: {e}")
+            self.path = None  # keep logging to the terminal and the ring
+
+    def _run(self):
+        last_sync = time.monotonic()
+        dirty = False
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+            lines, waiters = [], []
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is StopIteration:
+                    stop = True
+                else:
+                    lines.append(item)
+                if len(lines) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            if lines:
+                self._write(lines)
+                dirty = True
+            if dirty and (waiters or stop or time.monotonic() - last_sync >= self.fsync_interval):
+                try:
+                    self._sync()
+                except OSError:
+                    pass
+                dirty = False
+                last_sync = time.monotonic()
+            for waiter in waiters:
+                waiter.set()
+        if self._file is not None:
+            self._file.close()
+
+    def close(self, timeout=5.0):
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(StopIteration, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
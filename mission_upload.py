@@ -0,0 +1,174 @@
+import argparse
+import json
+import queue
+import time
+from collections import namedtuple
+
+from pymavlink import mavutil
+
+from mavlink_hub import MavlinkHub
+
+# Uploads a QGroundControl .plan (as written by convert_csv_to_plan) straight
+# to the autopilot with the MAVLink mission protocol, no QGC / xdotool needed:
+#   MISSION_COUNT -> vehicle requests each seq -> MISSION_ITEM_INT -> MISSION_ACK
+# Every wait has a timeout after which the last message is sent again.
+#
+#   uploader = MissionUploader(hub)
+#   uploader.upload_plan("mission.plan")     # full upload
+#   uploader.upload_plan("mission.plan")     # after editing a few waypoints: only those are sent
+#
+#   python mission_upload.py mission.plan --connection /dev/ttyACM0
+#
+# seq 0 is the home position (ArduPilot convention), the plan items follow.
+# The uploader remembers what it last uploaded; if the item count is unchanged
+# only the changed runs of items go out, using MISSION_WRITE_PARTIAL_LIST.
+
+MissionItem = namedtuple("MissionItem", "seq frame command autocontinue p1 p2 p3 p4 x y z")
+UploadResult = namedtuple("UploadResult", "total sent partial retransmits elapsed")
+
+
+class MissionUploadError(Exception):
+    pass
+
+
+def _param(value):
+    # QGC writes unused params as null, which MAVLink represents as NaN.
+    return float("nan") if value is None else float(value)
+
+
+def plan_items(plan_path):
+    with open(plan_path) as f:
+        mission = json.load(f)["mission"]
+    lat, lon, alt = mission["plannedHomePosition"]
+    items = [MissionItem(0, mavutil.mavlink.MAV_FRAME_GLOBAL, mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, 1,
+                         0.0, 0.0, 0.0, 0.0, int(round(lat * 1e7)), int(round(lon * 1e7)), float(alt))]
+    for item in mission["items"]:
+        if item.get("type") != "SimpleItem":
+            raise MissionUploadError(f"Unsupported plan item type {item.get('type')!r}")
+        p1, p2, p3, p4, x, y, z = (_param(v) for v in item["params"])
+        items.append(MissionItem(len(items), item["frame"], item["command"], int(item.get("autoContinue", True)),
+                                 p1, p2, p3, p4, int(round(x * 1e7)), int(round(y * 1e7)), z))
+    return items
+
+
+def _same(a, b):
+    return all(x == y or (x != x and y != y) for x, y in zip(a, b))  # NaN-aware
+
+
+def changed_runs(old, new):
+    # [(start, end)] inclusive seq ranges that differ between two equal-length missions.
+    runs = []
+    for seq, (a, b) in enumerate(zip(old, new)):
+        if _same(a, b):
+            continue
+        if runs and runs[-1][1] == seq - 1:
+            runs[-1][1] = seq
+        else:
+            runs.append([seq, seq])
+    return [tuple(run) for run in runs]
+
+
+class MissionUploader:
+    def __init__(self, hub, timeout=0.5, retries=5):
+        self.hub = hub
+        self.timeout = timeout  # seconds without a reply before resending
+        self.retries = retries  # resends of the same message before giving up
+        self.uploaded = None  # items the vehicle is known to hold
+
+    def upload_plan(self, plan_path, force_full=False):
+        return self.upload(plan_items(plan_path), force_full)
+
+    def upload(self, items, force_full=False):
+        start = time.monotonic()
+        try:
+            if not force_full and self.uploaded is not None and len(self.uploaded) == len(items):
+                runs = changed_runs(self.uploaded, items)
+                if not runs:
+                    print("[MISSION] Mission unchanged, nothing to upload")
+                    return UploadResult(len(items), 0, True, 0, time.monotonic() - start)
+                sent = retransmits = 0
+                for first, last in runs:
+                    n, r = self._transfer(items, first, last, partial=True)
+                    sent, retransmits = sent + n, retransmits + r
+                partial = True
+            else:
+                sent, retransmits = self._transfer(items, 0, len(items) - 1, partial=False)
+                partial = False
+        except Exception:
+            self.uploaded = None  # vehicle state unknown now; next upload is a full one
+            raise
+
+        self.uploaded = list(items)
+        result = UploadResult(len(items), sent, partial, retransmits, time.monotonic() - start)
+        print(f"[MISSION] Uploaded {sent}/{len(items)} items in {result.elapsed * 1000:.0f} ms"
+              f"{' (partial)' if partial else ''}, {retransmits} retransmits")
+        return result
+
+    def _send_item(self, item):
+        self.hub.send(self.hub.mav.mission_item_int_encode(
+            self.hub.master.target_system, self.hub.master.target_component,
+            item.seq, item.frame, item.command, 0, item.autocontinue,
+            item.p1, item.p2, item.p3, item.p4, item.x, item.y, item.z))
+
+    def _transfer(self, items, first, last, partial):
+        target = self.hub.master.target_system, self.hub.master.target_component
+        if partial:
+            opener = self.hub.mav.mission_write_partial_list_encode(*target, first, last)
+        else:
+            opener = self.hub.mav.mission_count_encode(*target, len(items))
+
+        replies = queue.Queue()
+        handles = [self.hub.subscribe(t, replies.put) for t in ("MISSION_REQUEST_INT", "MISSION_REQUEST", "MISSION_ACK")]
+        try:
+            resend = lambda: self.hub.send(opener)
+            resend()
+            needed = set(range(first, last + 1))
+            requested = set()
+            retransmits = attempts = 0
+            while True:
+                try:
+                    msg = replies.get(timeout=self.timeout)
+                except queue.Empty:
+                    attempts += 1
+                    if attempts > self.retries:
+                        raise TimeoutError(f"Mission upload stalled after {len(requested)} of {last - first + 1} items")
+                    retransmits += 1
+                    resend()
+                    continue
+                if msg.get_srcSystem() != target[0] or getattr(msg, "mission_type", 0) != 0:
+                    continue
+
+                if msg.get_type() == "MISSION_ACK":
+                    if msg.type != mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                        # A rejection can come at any point, e.g. NO_SPACE right after MISSION_COUNT.
+                        name = mavutil.mavlink.enums["MAV_MISSION_RESULT"].get(msg.type)
+                        raise MissionUploadError(f"Vehicle rejected mission: {name.name if name else msg.type}")
+                    if not needed <= requested:
+                        continue  # stale or duplicate ACK; the vehicle has not asked for every item yet
+                    return len(requested), retransmits
+
+                if not first <= msg.seq <= last:
+                    continue
+                item = items[msg.seq]
+                resend = lambda item=item: self._send_item(item)
+                resend()
+                requested.add(msg.seq)
+                attempts = 0
+        finally:
+            for handle in handles:
+                self.hub.unsubscribe(handle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload a .plan mission over MAVLink")
+    parser.add_argument("plan")
+    parser.add_argument("--connection", default="/dev/ttyACM0")
+    parser.add_argument("--baud", type=int, default=57600)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    hub = MavlinkHub.shared(args.connection, args.baud)
+    try:
+        MissionUploader(hub, timeout=args.timeout).upload_plan(args.plan)
+    finally:
+        hub.close()
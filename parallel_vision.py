@@ -0,0 +1,117 @@
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2 as cv
+
+from vision import visionNav
+
+# Spreads frames over worker processes, each holding its own visionNav.
+# Results come back in submission order; when every worker is busy new
+# frames are shed instead of queued (unless block=True, for offline runs).
+#
+#   with ParallelVision(workers=4, smoothing="bilateral_small") as pv:
+#       pv.process_stream(cv.VideoCapture(0), on_result)
+
+VisionResult = namedtuple("VisionResult", "seq captured_at detection image")
+
+_worker_nav = None
+
+
+def _init_worker(nav_kwargs):
+    global _worker_nav
+    cv.setNumThreads(1)  # one core per process; the pool provides the parallelism
+    _worker_nav = visionNav(**nav_kwargs)
+
+
+def _process_frame(seq, captured_at, image):
+    nav = _worker_nav
+    nav.image = image
+    nav.generate_masks()
+    detection = nav.detect_buoys()
+    return VisionResult(seq, captured_at, detection, nav.image if nav.draw else None)
+
+
+class ParallelVision:
+    def __init__(self, workers=None, max_in_flight=None, **nav_kwargs):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(nav_kwargs,))
+        self._pending = deque()  # futures in submission order
+        self._next_seq = 0
+        self.submitted = 0
+        self.completed = 0
+        self.shed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, image, captured_at=None, block=False):
+        # Returns the frame's sequence number, or None if it was shed.
+        busy = self._busy()
+        if len(busy) >= self.max_in_flight:
+            if not block:
+                self.shed += 1
+                return None
+            while len(busy) >= self.max_in_flight:
+                wait(busy, return_when=FIRST_COMPLETED)
+                busy = self._busy()
+
+        seq = self._next_seq
+        self._next_seq += 1
+        captured_at = time.monotonic() if captured_at is None else captured_at
+        self._pending.append(self.pool.submit(_process_frame, seq, captured_at, image))
+        self.submitted += 1
+        return seq
+
+    def _busy(self):
+        return [f for f in self._pending if not f.done()]
+
+    def results(self, wait_all=False):
+        # Yields finished results strictly in sequence order; a slow frame holds
+        # back the ones behind it so consumers never see reordering.
+        while self._pending and (wait_all or self._pending[0].done()):
+            result = self._pending.popleft().result()
+            self.completed += 1
+            yield result
+
+    def process_stream(self, video, on_result, max_frames=None, block=False):
+        frames = 0
+        try:
+            while video.isOpened() and (max_frames is None or frames < max_frames):
+                ret, image = video.read()
+                if not ret:
+                    break
+                frames += 1
+                self.submit(image, time.monotonic(), block=block)
+                for result in self.results():
+                    if on_result(result) is False:
+                        return self.stats()
+            for result in self.results(wait_all=True):
+                if on_result(result) is False:
+                    break
+        finally:
+            for future in self._pending:
+                future.cancel()
+            self._pending.clear()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "shed": self.shed,
+            "in_flight": len(self._busy()),
+        }
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque
+
+
+class Frame:
+    __slots__ = ("seq", "captured_at", "image")
+
+    def __init__(self, seq, captured_at, image):
+        self.seq = seq
+        self.captured_at = captured_at  # time.monotonic() of capture (video.captured_at if the source has it)
+        self.image = image
+
+    def age(self):
+        return time.monotonic() - self.captured_at
+
+
+class LatestSlot:
+    # Holds at most one item. A new put() replaces whatever the consumer has not
+    # picked up yet, so a slow stage always works on the freshest frame.
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._has_item = False
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._has_item:
+                self.dropped += 1
+            self._item = item
+            self._has_item = True
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._has_item or self._closed, timeout):
+                return None
+            if not self._has_item:
+                return None
+            item = self._item
+            self._item = None
+            self._has_item = False
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class VisionSnapshot:
+    # Everything the actuation stage needs from visionNav, copied out so the
+    # processing thread can move on to the next frame.
+    __slots__ = ("image", "detection", "middle_x", "width", "height", "distance", "has_masks")
+
+    def __init__(self, nav):
+        self.image = nav.image
+        self.detection = nav.detection
+        self.middle_x = nav.middle_x
+        self.width = nav.width
+        self.height = nav.height
+        self.distance = nav.distance
+        self.has_masks = nav.mask_r is not None and nav.mask_g is not None
+
+
+def run_vision(nav, frame):
+    nav.image = frame.image
+    nav.generate_masks()
+    nav.detect_buoys()
+    return VisionSnapshot(nav)
+
+
+def run_tracked(tracker, frame):
+    tracker.update(frame.image)
+    return VisionSnapshot(tracker.nav)
+
+
+class VisionPipeline:
+    # capture thread -> LatestSlot -> processing thread -> LatestSlot -> actuate (caller's thread)
+    #
+    # process(frame) returns any result object, actuate(frame, result) returns False
+    # to stop the pipeline. actuate runs in the thread that called run(), so
+    # cv.imshow / waitKey can live there.
+    def __init__(self, video, process, actuate, latency_window=300):
+        self.video = video
+        self.process = process
+        self.actuate = actuate
+
+        self.frames = LatestSlot()
+        self.results = LatestSlot()
+        self._stop = threading.Event()
+        self._threads = []
+
+        self.captured = 0
+        self.processed = 0
+        self.actuated = 0
+        self.latencies = deque(maxlen=latency_window)  # capture -> start of actuation, seconds
+        self.capture_failed = False
+        self.error = None
+
+    def _capture_loop(self):
+        seq = 0
+        try:
+            while not self._stop.is_set() and self.video.isOpened():
+                ret, image = self.video.read()
+                if not ret:
+                    self.capture_failed = True
+                    break
+                # Capture backends that know the exposure time (CameraCapture,
+                # RingReader) expose it as captured_at.
+                captured_at = getattr(self.video, "captured_at", None) or time.monotonic()
+                self.frames.put(Frame(seq, captured_at, image))
+                seq += 1
+                self.captured = seq
+        except Exception as e:
+            self.error = e
+        finally:
+            self.frames.close()
+
+    def _process_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self.frames.get(timeout=0.5)
+                if frame is None:
+                    if self.frames.closed:
+                        break
+                    continue
+                result = self.process(frame)
+                self.processed += 1
+                self.results.put((frame, result))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.results.close()
+
+    def start(self):
+        for target, name in ((self._capture_loop, "capture"), (self._process_loop, "vision")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self.frames.close()
+        self.results.close()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+
+    def run(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                item = self.results.get(timeout=0.5)
+                if item is None:
+                    if self.results.closed:
+                        break
+                    continue
+                frame, result = item
+                self.latencies.append(frame.age())
+                keep_going = self.actuate(frame, result)
+                self.actuated += 1
+                if keep_going is False:
+                    break
+        finally:
+            self.stop()
+        if self.error is not None:
+            raise self.error
+        return self.stats()
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        return {
+            "captured": self.captured,
+            "processed": self.processed,
+            "actuated": self.actuated,
+            "dropped_before_vision": self.frames.dropped,
+            "dropped_before_actuation": self.results.dropped,
+            "latency_p50_ms": lat[len(lat) // 2] * 1000 if lat else None,
+            "latency_max_ms": lat[-1] * 1000 if lat else None,
+        }
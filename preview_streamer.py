@@ -0,0 +1,228 @@
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # Windows: no send-queue query, writes are timed instead
+    fcntl = termios = None
+
+import cv2 as cv
+
+from pipeline import LatestSlot
+
+# Low-bandwidth MJPEG preview for the base station. publish() only hands the
+# frame to a worker thread, which downscales and JPEG-encodes it. Quality and
+# frame rate follow the throughput of the slowest viewer, and viewers always
+# get the newest frame (older ones are skipped).
+#
+# Throughput is measured from the time a frame takes to be acknowledged by the
+# viewer, not just copied into the kernel: each viewer socket gets a small send
+# buffer, and the next frame is only written once the kernel's unsent queue for
+# that viewer is empty (Linux SIOCOUTQ; elsewhere the blocking write is timed).
+#
+#   preview = PreviewStreamer(port=8080).start()
+#   preview.publish(annotated_frame)
+#   -> open http://<boat-ip>:8080/ in a browser
+
+SEND_BUFFER = 16 * 1024  # bytes; keeps the kernel from hiding a slow link
+DRAIN_POLL = 0.005  # seconds between unsent-queue checks
+DRAIN_TIMEOUT = 10.0  # give up waiting on a viewer that stopped acknowledging
+
+PAGE = b"""<html><head><title>Boat preview</title></head>
+<body style="margin:0;background:#111"><img src="/stream" style="width:100%"></body></html>"""
+
+
+def _unsent(sock):
+    # Bytes written to the socket but not yet acknowledged by the viewer, or None if unknown.
+    if fcntl is None:
+        return None
+    try:
+        return struct.unpack("i", fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, b"\0\0\0\0"))[0]
+    except OSError:
+        return None
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    streamer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path == "/stream":
+            self._stream()
+        else:
+            self.send_error(404)
+
+    def _stream(self):
+        streamer = self.streamer
+        self.send_response(200)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        sock = self.connection
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        streamer._client_joined()
+        last_seq = -1
+        try:
+            while not streamer.stopped:
+                jpeg, last_seq = streamer.wait_for_jpeg(last_seq, timeout=1.0)
+                if jpeg is None:
+                    continue
+                start = time.monotonic()
+                self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg))
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+                self.wfile.flush()
+                # Wait until the viewer has acknowledged the frame; newer frames
+                # published meanwhile replace each other, so only the latest goes next.
+                unsent = _unsent(sock)
+                while unsent and not streamer.stopped and time.monotonic() - start < DRAIN_TIMEOUT:
+                    time.sleep(DRAIN_POLL)
+                    unsent = _unsent(sock)
+                streamer.report_send(len(jpeg), time.monotonic() - start)
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            pass
+        finally:
+            streamer._client_left()
+
+
+class PreviewStreamer:
+    def __init__(self, host="0.0.0.0", port=8080, width=320, quality=60, min_quality=20, max_quality=85,
+                 max_fps=10.0, min_fps=1.0):
+        self.host = host
+        self.port = port
+        self.width = width
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.target_fps = max_fps
+
+        self.frames = LatestSlot()
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._last_publish = 0.0
+        self._clients = 0
+        self._throughput = None  # bytes/s, EWMA over sends to the slowest viewer
+        self.stopped = False
+
+        self.published = 0
+        self.skipped = 0
+        self.encoded = 0
+
+        self._server = None
+        self._threads = []
+
+    def start(self):
+        handler = type("PreviewHandler", (_PreviewHandler,), {"streamer": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        for target, name in ((self._server.serve_forever, "preview-http"), (self._encode_loop, "preview-encoder")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[PREVIEW] Streaming on http://{self.host}:{self.port}/")
+        return self
+
+    def publish(self, image):
+        # Cheap enough for the control loop: no copy of writable frames, no encoding.
+        now = time.monotonic()
+        if self._clients == 0 or now - self._last_publish < 1.0 / self.target_fps:
+            self.skipped += 1
+            return False
+        self._last_publish = now
+        self.published += 1
+        self.frames.put(image if image.flags.writeable else image.copy())
+        return True
+
+    def _encode_loop(self):
+        while not self.stopped:
+            image = self.frames.get(timeout=0.5)
+            if image is None:
+                continue
+            height, width = image.shape[:2]
+            if width > self.width:
+                image = cv.resize(image, (self.width, int(height * self.width / width)), interpolation=cv.INTER_AREA)
+            ok, jpeg = cv.imencode(".jpg", image, [cv.IMWRITE_JPEG_QUALITY, int(self.quality)])
+            if not ok:
+                continue
+            jpeg = jpeg.tobytes()
+            self.encoded += 1
+            self._adapt(len(jpeg))
+            with self._cond:
+                self._jpeg = jpeg
+                self._jpeg_seq += 1
+                self._cond.notify_all()
+
+    def _adapt(self, frame_bytes):
+        if self._throughput is None:
+            return
+        # Frame rate the link can carry at the current size, then nudge quality
+        # so that rate stays between min_fps and max_fps.
+        sustainable = self._throughput / max(frame_bytes, 1)
+        self.target_fps = max(self.min_fps, min(self.max_fps, sustainable * 0.8))
+        if sustainable < self.min_fps * 1.2:
+            self.quality = max(self.min_quality, self.quality - 5)
+        elif sustainable > self.max_fps * 2:
+            self.quality = min(self.max_quality, self.quality + 2)
+
+    def wait_for_jpeg(self, last_seq, timeout=1.0):
+        with self._cond:
+            self._cond.wait_for(lambda: self._jpeg_seq != last_seq or self.stopped, timeout)
+            if self._jpeg_seq == last_seq:
+                return None, last_seq
+            return self._jpeg, self._jpeg_seq
+
+    def report_send(self, nbytes, seconds):
+        rate = nbytes / max(seconds, 1e-4)
+        with self._cond:
+            if self._throughput is None:
+                self._throughput = rate
+            else:
+                # Falls fast, recovers slowly, so the slowest viewer dominates.
+                alpha = 0.5 if rate < self._throughput else 0.1
+                self._throughput += alpha * (rate - self._throughput)
+
+    def _client_joined(self):
+        with self._cond:
+            self._clients += 1
+
+    def _client_left(self):
+        with self._cond:
+            self._clients -= 1
+            if self._clients == 0:
+                self._throughput = None
+                self.target_fps = self.max_fps
+
+    def stats(self):
+        return {
+            "clients": self._clients,
+            "published": self.published,
+            "skipped": self.skipped,
+            "encoded": self.encoded,
+            "quality": self.quality,
+            "target_fps": round(self.target_fps, 1),
+            "throughput_kbps": round(self._throughput * 8 / 1000, 1) if self._throughput else None,
+        }
+
+    def stop(self):
+        self.stopped = True
+        self.frames.close()
+        with self._cond:
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
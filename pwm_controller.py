@@ -1,52 +1,80 @@
 from pymavlink import mavutil
-import time
+from mavlink_hub import MavlinkHub
+from actuator_output import ActuatorOutput
+
+STEERING_CHANNEL = 1
+THROTTLE_CHANNEL = 3
+
+# vision decision -> (steering, throttle); used by the steer/forward helpers and control_latency_bench.py
+DECISION_OUTPUTS = {
+    "KEEP_ROUTE": (1500, 1900),
+    "TURN_LEFT": (1100, 1500),
+    "TURN_RIGHT": (1900, 1500),
+    "TURN_AROUND": (1100, 1500),  # first leg of the turn-around
+}
+STOP_OUTPUTS = (1500, 1500)
 
 class PWMController:
-    def __init__(self, connection_str='/dev/ttyACM0', baud=57600):
+    def __init__(self, connection_str='/dev/ttyACM0', baud=57600, hub=None, keepalive=0.5):
+        # Shares the port with any other controller on the same connection_str.
         print("[PWM] Connecting to Pixhawk...")
-        self.master = mavutil.mavlink_connection(connection_str, baud=baud)
-        self.master.wait_heartbeat()
+        self.hub = hub or MavlinkHub.shared(connection_str, baud)
+        self.master = self.hub.master
         print("[PWM] Connected to Pixhawk.")
 
         print("[PWM] Arming Pixhawk...")
-        self.master.arducopter_arm()
-        self.master.motors_armed_wait()
+        self.hub.arm()
         print("[PWM] Pixhawk armed.")
 
+        # Steering and throttle go out together in one RC override, only on change
+        self.output = ActuatorOutput(self.hub, keepalive=keepalive).start()
+
     def send_pwm(self, channel, pwm_value):
+        # Single servo output via DO_SET_SERVO, bypassing the combined output.
+        # Sent straight away; returns a Future of the ACK (call .result() to wait).
         print(f"[PWM] Setting channel {channel} to {pwm_value}")
-        self.master.mav.command_long_send(
-            self.master.target_system,
-            self.master.target_component,
+        return self.hub.commands.submit(
             mavutil.mavlink.MAV_CMD_DO_SET_SERVO,
-            0,
             channel,
-            pwm_value,
-            0, 0, 0, 0, 0
+            pwm_value
         )
-        time.sleep(0.1)
+
+    def set_outputs(self, steering, throttle):
+        # Returns False when nothing changed (no message is sent).
+        return self.output.set({STEERING_CHANNEL: steering, THROTTLE_CHANNEL: throttle})
+
+    def apply_decision(self, decision):
+        # Outputs for a vision decision (unknown decisions stop); False when nothing changed.
+        if decision not in DECISION_OUTPUTS:
+            self.stop_all()
+            return True
+        return self.set_outputs(*DECISION_OUTPUTS[decision])
 
     def steer_left(self):
         print("[PWM] Steer LEFT")
-        self.send_pwm(1, 1100)
-        self.send_pwm(3, 1500)
+        self.set_outputs(*DECISION_OUTPUTS["TURN_LEFT"])
 
     def steer_right(self):
         print("[PWM] Steer RIGHT")
-        self.send_pwm(1, 1900)
-        self.send_pwm(3, 1500)
+        self.set_outputs(*DECISION_OUTPUTS["TURN_RIGHT"])
 
     def go_forward(self):
         print("[PWM] Forward")
-        self.send_pwm(1, 1500)
-        self.send_pwm(3, 1900)
+        self.set_outputs(*DECISION_OUTPUTS["KEEP_ROUTE"])
 
     def stop_all(self):
+        # Sent at once, never merged with an earlier queued output.
         print("[PWM] STOP")
-        self.send_pwm(1, 1500)
-        self.send_pwm(3, 1500)
+        steering, throttle = STOP_OUTPUTS
+        self.output.set({STEERING_CHANNEL: steering, THROTTLE_CHANNEL: throttle}, immediate=True)
 
     def neutral(self):
+        # Releases the override so the safety pilot's sticks are in control again.
         print("[PWM] Neutral all channels")
-        self.send_pwm(1, 1500)
-        self.send_pwm(3, 1500)
+        self.output.release([STEERING_CHANNEL, THROTTLE_CHANNEL])
+
+    def close(self):
+        # Sends any pending output, hands steering/throttle back to the RC
+        # transmitter and waits until that is on the wire. Call before exiting.
+        self.output.close()
+        print(f"[PWM] Output stats: {self.output.stats()}")
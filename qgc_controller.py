@@ -1,44 +1,46 @@
 from pymavlink import mavutil
-import time
+from mavlink_hub import MavlinkHub
+from telemetry_cache import TelemetryCache
+from mission_upload import MissionUploader
 
 class QGCMissionController:
-    def __init__(self, connection_str='/dev/ttyACM0', baud=57600):
+    def __init__(self, connection_str='/dev/ttyACM0', baud=57600, hub=None, telemetry_rates=None):
+        # Shares the port with any other controller on the same connection_str.
         print("[QGC] Connecting to Pixhawk...")
-        self.master = mavutil.mavlink_connection(connection_str, baud=baud)
-        self.master.wait_heartbeat()
+        self.hub = hub or MavlinkHub.shared(connection_str, baud)
+        self.master = self.hub.master
         print("[QGC] Connected to Pixhawk.")
 
+        # Mode / position / mission progress, kept current in the background
+        self.telemetry = TelemetryCache(self.hub, telemetry_rates).start()
+        self.uploader = MissionUploader(self.hub)
+
+    # Both return a Future of the COMMAND_ACK; .result() waits for confirmation
+    # (raises TimeoutError / CommandFailed), otherwise it is fire-and-forget.
     def pause_mission(self):
         print("[QGC] Pausing mission...")
-        self.master.mav.command_long_send(
-            self.master.target_system,
-            self.master.target_component,
+        return self.hub.commands.submit(
             mavutil.mavlink.MAV_CMD_DO_PAUSE_CONTINUE,
-            0,
-            1, 0, 0, 0, 0, 0  # param1 = 1 → Pause
+            1  # param1 = 1 → Pause
         )
-        time.sleep(1)
 
     def resume_mission(self):
         print("[QGC] Resuming mission...")
-        self.master.mav.command_long_send(
-            self.master.target_system,
-            self.master.target_component,
+        return self.hub.commands.submit(
             mavutil.mavlink.MAV_CMD_DO_PAUSE_CONTINUE,
-            0,
-            0, 0, 0, 0, 0, 0  # param1 = 0 → Resume
+            0  # param1 = 0 → Resume
         )
-        time.sleep(1)
+
+    def upload_mission(self, plan_path):
+        # Direct MAVLink upload; re-uploading an edited plan only sends changed items.
+        return self.uploader.upload_plan(plan_path)
 
     def get_mode(self):
-        print("[QGC] Checking current mode...")
-        self.master.mav.request_data_stream_send(
-            self.master.target_system,
-            self.master.target_component,
-            mavutil.mavlink.MAV_DATA_STREAM_ALL,
-            1, 1
-        )
-        msg = self.master.recv_match(type='HEARTBEAT', blocking=True)
-        mode = mavutil.mode_string_v10(msg)
-        print(f"[QGC] Mode: {mode}")
-        return mode
+        # Last heartbeat's mode from the cache; None until one has arrived.
+        return self.telemetry.mode()
+
+    def get_position(self):
+        return self.telemetry.position()
+
+    def get_mission_seq(self):
+        return self.telemetry.mission_seq()
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import namedtuple
+
+# Runs independent startup steps at the same time instead of one after the other.
+#
+#   startup = Startup()
+#   startup.step("camera", warm_up_camera, timeout=10)
+#   startup.step("mavlink", connect, timeout=15)
+#   startup.step("upload", lambda: upload(startup.value("mavlink")), after=["mavlink"], timeout=10)
+#   startup.step("qgc", launch_qgc, required=False)
+#   startup.run()            # readiness barrier: returns once every required step is done
+#   print(startup.report())
+#
+# A step starts as soon as the steps it depends on have finished. run() raises
+# StartupError as soon as a required step fails or overruns its timeout;
+# optional steps never hold up the barrier and may finish later.
+
+StepResult = namedtuple("StepResult", "name status value error started elapsed")
+
+
+class StartupError(Exception):
+    pass
+
+
+class _Step:
+    def __init__(self, name, fn, timeout, after, required):
+        self.name = name
+        self.fn = fn
+        self.timeout = timeout
+        self.after = list(after)
+        self.required = required
+        self.done = threading.Event()
+        self.status = "pending"  # running / ok / failed / skipped / timeout
+        self.value = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+
+class Startup:
+    def __init__(self):
+        self._steps = {}
+        self._t0 = None
+        self.ready_after = None  # seconds from run() to the barrier opening
+
+    def step(self, name, fn, timeout=None, after=(), required=True):
+        self._steps[name] = _Step(name, fn, timeout, after, required)
+        return self
+
+    def value(self, name):
+        return self._steps[name].value
+
+    def _run_step(self, step):
+        for dep in step.after:
+            self._steps[dep].done.wait()
+            if self._steps[dep].status != "ok":
+                step.status = "skipped"
+                step.error = f"needs {dep}"
+                step.done.set()
+                return
+        step.started = time.monotonic()
+        step.status = "running"
+        try:
+            step.value = step.fn()
+            step.status = "ok" if step.status == "running" else step.status
+        except Exception as e:
+            step.error = e
+            step.status = "failed" if step.status == "running" else step.status
+        step.finished = time.monotonic()
+        step.done.set()
+
+    def run(self, on_wait=None, poll=0.05):
+        # on_wait() is called every poll seconds while waiting (e.g. to keep a GUI responsive).
+        self._t0 = time.monotonic()
+        for step in self._steps.values():
+            threading.Thread(target=self._run_step, args=(step,), name=f"startup-{step.name}", daemon=True).start()
+
+        required = [s for s in self._steps.values() if s.required]
+        while True:
+            now = time.monotonic()
+            for step in required:
+                if step.status == "running" and step.timeout is not None and now - step.started > step.timeout:
+                    step.status = "timeout"  # the thread is abandoned; it cannot be interrupted
+                    step.error = f"no result after {step.timeout:g}s"
+                    step.done.set()
+                if step.done.is_set() and step.status != "ok":
+                    raise StartupError(f"Startup step '{step.name}' {step.status}: {step.error}")
+            if all(step.done.is_set() for step in required):
+                self.ready_after = time.monotonic() - self._t0
+                return {name: step.value for name, step in self._steps.items()}
+            if on_wait is not None:
+                on_wait()
+            time.sleep(poll)
+
+    def results(self):
+        out = []
+        for step in self._steps.values():
+            started = step.started - self._t0 if step.started and self._t0 else None
+            end = step.finished or (time.monotonic() if step.started else None)
+            elapsed = end - step.started if step.started else None
+            out.append(StepResult(step.name, step.status, step.value, step.error, started, elapsed))
+        return out
+
+    def report(self):
+        lines = []
+        total = 0.0
+        for r in self.results():
+            if r.started is None:
+                lines.append(f"  {r.name:10} {r.status}")
+                continue
+            total += r.elapsed
+            lines.append(f"  {r.name:10} {r.status:8} start +{r.started:5.2f}s  took {r.elapsed:5.2f}s")
+        ready = f"ready after {self.ready_after:.2f}s" if self.ready_after is not None else "not ready"
+        lines.insert(0, f"Startup: {ready}, {total:.2f}s of step time run concurrently")
+        return "\n".join(lines)
@@ -0,0 +1,198 @@
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Log lines to the base station without ever blocking the control loop.
+# send() only appends to a bounded buffer; a background thread connects,
+# writes the buffered lines in batches and reconnects with exponential backoff
+# when the link drops. Lines buffered while disconnected (or in a batch whose
+# write failed) are sent after reconnecting; when the buffer is full the
+# oldest line is dropped and counted.
+#
+#   uplink = TcpUplink("172.16.21.153", 9999, boat_id="boat1").start()
+#   uplink.send("📷 Vision Decision: TURN_LEFT")
+#   uplink.stats()
+#   uplink.close()
+#
+# The wire format is one UTF-8 line per message. With a boat_id, every
+# connection starts with "BOAT <id>" (see boat_log_server.py). A batch that
+# failed halfway is sent again in full, so the server may see a few lines twice
+# around a reconnect; lines the kernel accepted just before the link died can
+# still be lost (TCP gives no receipt for them).
+
+HELLO_PREFIX = "BOAT "
+
+
+class TcpUplink:
+    def __init__(self, host, port, boat_id=None, capacity=5000, batch_lines=100, batch_bytes=32768,
+                 linger=0.02, connect_timeout=2.0, send_timeout=2.0, backoff=(0.5, 10.0)):
+        self.address = (host, port)
+        self.boat_id = boat_id
+        self.capacity = capacity
+        self.batch_lines = batch_lines
+        self.batch_bytes = batch_bytes
+        self.linger = linger  # seconds to wait for more lines before writing a short batch
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout  # a write stalled this long counts as a dropped link
+        self.backoff = backoff  # (first, max) seconds between connection attempts
+
+        self._buffer = deque()  # (queued_at, encoded line)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._sock = None
+        self._thread = None
+
+        self.connected = False
+        self.queued = 0
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.connects = 0
+        self.failures = 0
+        self.last_error = None
+        self._latency = deque(maxlen=1000)  # seconds from send() to the write completing
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tcp-uplink", daemon=True)
+        self._thread.start()
+        return self
+
+    def send(self, message):
+        line = (message.rstrip("\n") + "\n").encode("utf-8", "replace")
+        with self._cond:
+            if len(self._buffer) >= self.capacity:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append((time.monotonic(), line))
+            self.queued += 1
+            self._cond.notify()
+
+    def depth(self):
+        return len(self._buffer)
+
+    # --- background thread ---
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+        sock.settimeout(self.send_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.boat_id is not None:
+            sock.sendall(f"{HELLO_PREFIX}{self.boat_id}\n".encode())
+        return sock
+
+    def _next_batch(self):
+        # Waits for lines, lets a short burst accumulate, then takes up to one batch.
+        with self._cond:
+            while not self._buffer and not self._stopped:
+                self._cond.wait()
+            if self._stopped and not self._buffer:
+                return None
+            if len(self._buffer) < self.batch_lines and self.linger and not self._stopped:
+                self._cond.wait(self.linger)
+            batch, size = [], 0
+            while self._buffer and len(batch) < self.batch_lines and size < self.batch_bytes:
+                entry = self._buffer.popleft()
+                batch.append(entry)
+                size += len(entry[1])
+            return batch
+
+    def _requeue(self, batch):
+        # Puts an unsent batch back in front, keeping the newest lines if it no longer fits.
+        with self._cond:
+            room = self.capacity - len(self._buffer)
+            if room < len(batch):
+                self.dropped += len(batch) - max(room, 0)
+                batch = batch[len(batch) - max(room, 0):]
+            self._buffer.extendleft(reversed(batch))
+
+    def _disconnect(self, error):
+        self.connected = False
+        self.failures += 1
+        self.last_error = str(error)
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _run(self):
+        delay = self.backoff[0]
+        while True:
+            if self._sock is None:
+                if self._stopped:
+                    return
+                try:
+                    self._sock = self._connect()
+                except OSError as e:
+                    self._disconnect(e)
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopped, timeout=delay)
+                    delay = min(delay * 2, self.backoff[1])
+                    continue
+                self.connected = True
+                self.connects += 1
+                delay = self.backoff[0]
+                print(f"[UPLINK] Connected to {self.address[0]}:{self.address[1]} ({len(self._buffer)} lines buffered)")
+
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                self._sock.sendall(b"".join(line for _, line in batch))
+            except OSError as e:
+                self._requeue(batch)
+                print(f"[UPLINK] Link lost: {e}; reconnecting")
+                self._disconnect(e)
+                continue
+            done = time.monotonic()
+            with self._cond:
+                self.sent += len(batch)
+                self.batches += 1
+                self._latency.extend(done - queued_at for queued_at, _ in batch)
+
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+        self.connected = False
+
+    def stats(self):
+        with self._cond:
+            latency = np.asarray(self._latency) * 1000 if self._latency else None
+        report = {
+            "connected": self.connected,
+            "depth": len(self._buffer),
+            "queued": self.queued,
+            "sent": self.sent,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "connects": self.connects,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+        if latency is not None:
+            report.update(latency_p50_ms=round(float(np.percentile(latency, 50)), 1),
+                          latency_p95_ms=round(float(np.percentile(latency, 95)), 1),
+                          latency_max_ms=round(float(latency.max()), 1))
+        return report
+
+    def close(self, timeout=2.0):
+        # Gives the thread up to timeout seconds to send what is still buffered.
+        if self._thread is None:
+            return self.stats()
+        deadline = time.monotonic() + timeout
+        while self._buffer and self.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        self._thread = None
+        return self.stats()
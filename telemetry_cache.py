@@ -0,0 +1,115 @@
+import time
+from collections import namedtuple
+
+from pymavlink import mavutil
+
+# Latest vehicle state, kept current by the hub's reader thread, so mode,
+# position and mission progress are dictionary lookups instead of a blocking
+# recv. Only the messages below are requested, each at its own rate, with
+# MAV_CMD_SET_MESSAGE_INTERVAL (no MAV_DATA_STREAM_ALL flood).
+#
+#   telemetry = TelemetryCache(hub, rates={"GLOBAL_POSITION_INT": 10}).start()
+#   telemetry.mode(), telemetry.position(), telemetry.mission_seq(), telemetry.age("VFR_HUD")
+
+# Hz per message; None = do not request (HEARTBEAT is always sent at 1 Hz).
+DEFAULT_RATES = {
+    "HEARTBEAT": None,
+    "GLOBAL_POSITION_INT": 5.0,
+    "VFR_HUD": 4.0,
+    "MISSION_CURRENT": 1.0,
+    "SYS_STATUS": 1.0,
+}
+
+# lat/lon in degrees, alt metres above home, heading degrees (None if unknown), age seconds
+Position = namedtuple("Position", "lat lon alt heading age")
+
+
+class TelemetryCache:
+    def __init__(self, hub, rates=None):
+        self.hub = hub
+        self.rates = dict(DEFAULT_RATES)
+        self.rates.update(rates or {})
+        self._latest = {}  # type -> (msg, monotonic receive time); swapped whole, safe to read unlocked
+        self._handles = []
+
+    def start(self):
+        # Seed from whatever the link already saw (e.g. the handshake heartbeat).
+        for msg_type in self.rates:
+            msg = self.hub.master.messages.get(msg_type)
+            if msg is not None and self._from_vehicle(msg):
+                age = max(0.0, time.time() - getattr(msg, "_timestamp", time.time()))
+                self._latest[msg_type] = (msg, time.monotonic() - age)
+        for msg_type in self.rates:
+            self._handles.append(self.hub.subscribe(msg_type, self._on_message))
+        self.request_intervals()
+        return self
+
+    def request_intervals(self):
+        # Returns {message: Future of the ACK}; autopilots that do not know the
+        # command reject it and keep their configured stream rates.
+        futures = {}
+        for msg_type, hz in self.rates.items():
+            if not hz:
+                continue
+            msg_id = getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{msg_type}")
+            futures[msg_type] = self.hub.commands.submit(
+                mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL, msg_id, int(1e6 / hz))
+        return futures
+
+    def _from_vehicle(self, msg):
+        # Ignore other systems on the link (e.g. a GCS heartbeat through a router).
+        return msg.get_srcSystem() == self.hub.master.target_system
+
+    def _on_message(self, msg):
+        if self._from_vehicle(msg):
+            self._latest[msg.get_type()] = (msg, time.monotonic())
+
+    # --- lookups (never block) ---
+
+    def get(self, msg_type):
+        entry = self._latest.get(msg_type)
+        return entry[0] if entry else None
+
+    def age(self, msg_type):
+        entry = self._latest.get(msg_type)
+        return time.monotonic() - entry[1] if entry else None
+
+    def mode(self):
+        msg = self.get("HEARTBEAT")
+        return mavutil.mode_string_v10(msg) if msg else None
+
+    def armed(self):
+        msg = self.get("HEARTBEAT")
+        return bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED) if msg else None
+
+    def position(self):
+        entry = self._latest.get("GLOBAL_POSITION_INT")
+        if not entry:
+            return None
+        msg, received = entry
+        heading = None if msg.hdg == 65535 else msg.hdg / 100.0
+        return Position(msg.lat / 1e7, msg.lon / 1e7, msg.relative_alt / 1000.0, heading, time.monotonic() - received)
+
+    def mission_seq(self):
+        msg = self.get("MISSION_CURRENT")
+        return msg.seq if msg else None
+
+    def groundspeed(self):
+        msg = self.get("VFR_HUD")
+        return msg.groundspeed if msg else None
+
+    def battery(self):
+        # (volts, remaining %) or None; remaining is -1 when the autopilot does not estimate it.
+        msg = self.get("SYS_STATUS")
+        return (msg.voltage_battery / 1000.0, msg.battery_remaining) if msg else None
+
+    def stop(self, restore_rates=True):
+        for handle in self._handles:
+            self.hub.unsubscribe(handle)
+        self._handles = []
+        if restore_rates:
+            # Interval 0 puts each message back on the autopilot's default rate.
+            for msg_type, hz in self.rates.items():
+                if hz:
+                    msg_id = getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{msg_type}")
+                    self.hub.commands.submit(mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL, msg_id, 0)
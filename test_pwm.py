@@ -18,3 +18,4 @@ time.sleep(2)
 
 print("STOPPING...")
 pwm.stop_all()
+pwm.close()
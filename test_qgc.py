@@ -4,8 +4,8 @@ import time
 # Replace with correct connection string if needed
 qgc = QGCMissionController(connection_str='/dev/ttyACM0')
 
-qgc.pause_mission()
+qgc.pause_mission().result()  # waits for the COMMAND_ACK
 print("Mission Paused")
 time.sleep(3)
-qgc.resume_mission()
+qgc.resume_mission().result()
 print("Mission Resumed")
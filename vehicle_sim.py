@@ -0,0 +1,201 @@
+import argparse
+import csv
+import heapq
+import random
+import threading
+import time
+
+from pymavlink import mavutil
+
+# Minimal MAVLink boat for testing without a Pixhawk. It sends heartbeats,
+# ACKs COMMAND_LONG after a configurable delay, drops a configurable share of
+# what it receives, follows arm/pause/stream-interval commands, accepts mission
+# uploads, and logs every servo value it is given with a monotonic timestamp.
+#
+#   python vehicle_sim.py                          # talks to udp:127.0.0.1:14551 (the filepicker scripts' MAVLINK_UDP)
+#   python vehicle_sim.py --ack-delay 0.03 --loss 0.05 --servo-log servo.csv
+#   -> PWMController('udpin:127.0.0.1:14551')
+#
+# In-process (see control_latency_bench.py):
+#   sim = VehicleSim(ack_delay=0.02).start(); ...; sim.servo_log
+
+# (monotonic time, channel, pwm, source) with source "servo" (DO_SET_SERVO) or "rc" (RC override)
+SERVO_FIELDS = ("time", "channel", "pwm", "source")
+
+# ArduRover custom modes used in heartbeats
+MODE_MANUAL, MODE_HOLD, MODE_AUTO = 0, 4, 10
+
+
+class VehicleSim:
+    def __init__(self, connection="udpout:127.0.0.1:14551", system=1, component=1,
+                 ack_delay=0.0, ack_jitter=0.0, loss=0.0, heartbeat_hz=1.0, seed=None):
+        self.connection = connection
+        self.link = mavutil.mavlink_connection(connection, source_system=system, source_component=component)
+        self.ack_delay = ack_delay
+        self.ack_jitter = ack_jitter
+        self.loss = loss
+        self.heartbeat_interval = 1.0 / heartbeat_hz
+        self.rng = random.Random(seed)
+
+        self.armed = False
+        self.mode = MODE_AUTO
+        self.mission = {}
+        self.mission_count = 0
+        self._mission_range = None
+        self._mission_next = None
+        self.intervals = {}  # msg id -> seconds, from SET_MESSAGE_INTERVAL
+
+        self.servo_log = []
+        self.received = 0
+        self.dropped = 0
+        self.acks = 0
+
+        self._outgoing = []  # heap of (due time, order, message)
+        self._order = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for target, name in ((self._receive_loop, "sim-receive"), (self._send_loop, "sim-send")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[SIM] Vehicle simulator on {self.connection} (ack delay {self.ack_delay * 1000:.0f} ms, loss {self.loss:.0%})")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=1)
+        self.link.close()
+
+    # --- outgoing ---
+
+    def _schedule(self, msg, delay=0.0):
+        with self._lock:
+            heapq.heappush(self._outgoing, (time.monotonic() + delay, self._order, msg))
+            self._order += 1
+        self._wake.set()
+
+    def _heartbeat(self):
+        base_mode = mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+        if self.armed:
+            base_mode |= mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+        return self.link.mav.heartbeat_encode(mavutil.mavlink.MAV_TYPE_SURFACE_BOAT,
+                                              mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                                              base_mode, self.mode, mavutil.mavlink.MAV_STATE_ACTIVE)
+
+    def _send_loop(self):
+        next_heartbeat = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_heartbeat:
+                self.link.mav.send(self._heartbeat())
+                next_heartbeat = now + self.heartbeat_interval
+            due = []
+            with self._lock:
+                while self._outgoing and self._outgoing[0][0] <= now:
+                    due.append(heapq.heappop(self._outgoing)[2])
+                wake = self._outgoing[0][0] if self._outgoing else next_heartbeat
+            for msg in due:
+                self.link.mav.send(msg)
+            self._wake.wait(max(0.0, min(wake, next_heartbeat) - time.monotonic()))
+            self._wake.clear()
+
+    def _ack(self, command, result=mavutil.mavlink.MAV_RESULT_ACCEPTED):
+        delay = self.ack_delay + (self.rng.uniform(0, self.ack_jitter) if self.ack_jitter else 0.0)
+        self.acks += 1
+        self._schedule(self.link.mav.command_ack_encode(command, result), delay)
+
+    # --- incoming ---
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            msg = self.link.recv_match(blocking=True, timeout=0.2)
+            if msg is None or msg.get_type() == "BAD_DATA":
+                continue
+            received_at = time.monotonic()
+            self.received += 1
+            if self.loss and self.rng.random() < self.loss:
+                self.dropped += 1
+                continue
+            handler = getattr(self, "_on_" + msg.get_type().lower(), None)
+            if handler is not None:
+                handler(msg, received_at)
+
+    def _on_command_long(self, msg, received_at):
+        mav = mavutil.mavlink
+        if msg.command == mav.MAV_CMD_COMPONENT_ARM_DISARM:
+            self.armed = msg.param1 == 1
+        elif msg.command == mav.MAV_CMD_DO_SET_SERVO:
+            self.servo_log.append((received_at, int(msg.param1), int(msg.param2), "servo"))
+        elif msg.command == mav.MAV_CMD_DO_PAUSE_CONTINUE:
+            self.mode = MODE_HOLD if msg.param1 == 1 else MODE_AUTO
+        elif msg.command == mav.MAV_CMD_SET_MESSAGE_INTERVAL:
+            self.intervals[int(msg.param1)] = msg.param2 / 1e6
+        self._ack(msg.command)
+
+    def _on_rc_channels_override(self, msg, received_at):
+        for channel in range(1, 19):
+            value = getattr(msg, f"chan{channel}_raw", None)
+            if value is None or value == 65535 or (channel > 8 and value == 0):
+                continue
+            self.servo_log.append((received_at, channel, int(value), "rc"))
+
+    # Mission protocol, enough for MissionUploader: the vehicle drives the transfer.
+    def _request_item(self, seq):
+        self._schedule(self.link.mav.mission_request_int_encode(255, 0, seq))
+
+    def _on_mission_count(self, msg, received_at):
+        self.mission_count = msg.count
+        self._mission_range = (0, msg.count - 1)
+        self._mission_next = 0
+        self._request_item(0)
+
+    def _on_mission_write_partial_list(self, msg, received_at):
+        self._mission_range = (msg.start_index, msg.end_index)
+        self._mission_next = msg.start_index
+        self._request_item(msg.start_index)
+
+    def _on_mission_item_int(self, msg, received_at):
+        if self._mission_range is None:
+            return
+        self.mission[msg.seq] = msg
+        if msg.seq == self._mission_next:
+            self._mission_next += 1
+        if self._mission_next > self._mission_range[1]:
+            self._mission_range = None
+            self._schedule(self.link.mav.mission_ack_encode(255, 0, mavutil.mavlink.MAV_MISSION_ACCEPTED))
+        else:
+            self._request_item(self._mission_next)
+
+    def save_servo_log(self, path):
+        with open(path, "w", newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(SERVO_FIELDS)
+            writer.writerows(self.servo_log)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated MAVLink boat for hardware-free testing")
+    parser.add_argument("--connection", default="udpout:127.0.0.1:14551")
+    parser.add_argument("--ack-delay", type=float, default=0.0, help="Seconds before each COMMAND_ACK")
+    parser.add_argument("--ack-jitter", type=float, default=0.0, help="Extra random ACK delay, up to this many seconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="Share of received messages to drop (0-1)")
+    parser.add_argument("--servo-log", default=None, help="CSV of received servo values, written on exit")
+    args = parser.parse_args()
+
+    sim = VehicleSim(args.connection, ack_delay=args.ack_delay, ack_jitter=args.ack_jitter, loss=args.loss).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        print(f"[SIM] received {sim.received}, dropped {sim.dropped}, acked {sim.acks}, servo values {len(sim.servo_log)}")
+        if args.servo_log:
+            sim.save_servo_log(args.servo_log)
@@ -0,0 +1,127 @@
+import os
+import queue
+import threading
+import time
+
+import cv2 as cv
+
+# Encodes frames on its own thread so mp4 writing never stalls the control
+# loop. submit() never blocks: frames are decimated (keep every Nth), and when
+# the encoder falls behind the queue is full and the frame is dropped and counted.
+# Offline processing passes block=True instead, which waits for room in the
+# queue so every frame ends up in the file.
+#
+#   recorder = VideoRecorder("recordings/run.mp4", fps=30, size=(640, 360), every=2).start()
+#   recorder.submit(frame)
+#   recorder.submit(frame, block=True)   # post-processing a recording: never drop
+#   ...
+#   recorder.close()
+
+
+class VideoRecorder:
+    def __init__(self, path, fps=30.0, fourcc="mp4v", size=None, every=1, queue_size=30):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.size = size  # (width, height) to encode at; None keeps the input size
+        self.every = max(1, int(every))
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        self.submitted = 0
+        self.decimated = 0
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+
+        self._writer = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="video-recorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, frame, copy=None, block=False):
+        # copy=None copies only frames the producer may reuse (read-only
+        # ring-buffer views). Pass copy=True if you will draw on the frame later.
+        # block=True waits for the encoder instead of dropping; it only gives up
+        # (and counts a drop) if the encoder thread has stopped.
+        self.submitted += 1
+        if (self.submitted - 1) % self.every:
+            self.decimated += 1
+            return False
+        if self.error is not None:
+            self.dropped += 1
+            return False
+        if copy or (copy is None and not frame.flags.writeable):
+            frame = frame.copy()
+        if not block:
+            try:
+                self.queue.put_nowait(frame)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+        while self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(frame, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        self.dropped += 1
+        return False
+
+    def _open(self, frame):
+        height, width = frame.shape[:2]
+        size = self.size or (width, height)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        writer = cv.VideoWriter(self.path, cv.VideoWriter_fourcc(*self.fourcc), self.fps / self.every, size)
+        if not writer.isOpened():
+            raise IOError(f"Could not open video writer for {self.path} ({self.fourcc})")
+        return writer
+
+    def _run(self):
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                if self._writer is None:
+                    self._writer = self._open(frame)
+                if self.size and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+                    frame = cv.resize(frame, tuple(self.size), interpolation=cv.INTER_AREA)
+                self._writer.write(frame)
+                self.written += 1
+        except Exception as e:
+            self.error = e
+            print(f"[REC] Recording stopped: {e}")
+        finally:
+            if self._writer is not None:
+                self._writer.release()
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "decimated": self.decimated,
+            "dropped": self.dropped,
+            "written": self.written,
+            "queued": self.queue.qsize(),
+        }
+
+    def close(self, timeout=10.0):
+        # Flushes whatever is queued, then stops the encoder.
+        if self._thread is None:
+            return self.stats()
+        deadline = time.monotonic() + timeout
+        while self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                if time.monotonic() > deadline:
+                    break
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._thread = None
+        return self.stats()
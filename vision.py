@@ -1,12 +1,150 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
 import cv2 as cv
 import numpy as np
 
+from video_recorder import VideoRecorder
+from camera_capture import open_camera
+
+RED_HSV = {
+    "lower1": np.array([0, 40, 40]),
+    "upper1": np.array([10, 255, 255]),
+    "lower2": np.array([170, 0, 20]),
+    "upper2": np.array([180, 255, 255])
+}
+GREEN_HSV = {
+    "lower": np.array([30, 40, 0]),
+    "upper": np.array([90, 255, 255])
+}
+
+# "bilateral" is the original full-resolution d=25 filter. The others smooth a
+# downscaled copy (1/2 for bilateral_small, 1/4 for the pyramid modes).
+SMOOTHING_MODES = ("bilateral", "bilateral_small", "pyramid_gaussian", "pyramid_median")
+DEFAULT_SMOOTHING = "bilateral"  # what visionNav applies unless told otherwise
+
+# "hsv" converts every frame and runs inRange; "lut" maps BGR straight to a
+# buoy label through a table built once from the same thresholds.
+CLASSIFIERS = ("hsv", "lut")
+
+LABEL_NONE, LABEL_RED, LABEL_GREEN = 0, 1, 2
+LUT_BITS = 6  # bits kept per BGR channel -> 64**3 entries, 256 KB (at most 7, remap limit)
+LUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lut_cache")
+
+# Written by hsv_calibrate.py; picked up automatically when present.
+HSV_PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hsv_profile.json")
+
+def load_hsv_profile(path=HSV_PROFILE_PATH):
+    with open(path) as f:
+        profile = json.load(f)
+    red = {key: np.array(profile["red"][key]) for key in ("lower1", "upper1", "lower2", "upper2")}
+    green = {key: np.array(profile["green"][key]) for key in ("lower", "upper")}
+    return red, green
+
+def hsv_threshold(hsv, red=RED_HSV, green=GREEN_HSV):
+    mask_g = cv.inRange(hsv, green["lower"], green["upper"])
+    mask_r1 = cv.inRange(hsv, red["lower1"], red["upper1"])
+    mask_r2 = cv.inRange(hsv, red["lower2"], red["upper2"])
+    return mask_r1 | mask_r2, mask_g
+
+def lut_key(bits=LUT_BITS, red=RED_HSV, green=GREEN_HSV):
+    thresholds = {
+        "bits": bits,
+        "red": {k: np.asarray(v).tolist() for k, v in sorted(red.items())},
+        "green": {k: np.asarray(v).tolist() for k, v in sorted(green.items())},
+    }
+    return hashlib.sha1(json.dumps(thresholds, sort_keys=True).encode()).hexdigest()[:16]
+
+def build_buoy_lut(bits=LUT_BITS, red=RED_HSV, green=GREEN_HSV):
+    # Every quantized BGR cell is classified by its centre colour.
+    step = 256 >> bits
+    centres = (np.arange(1 << bits) * step + step // 2).astype(np.uint8)
+    b, g, r = np.meshgrid(centres, centres, centres, indexing="ij")
+    bgr = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=-1).reshape(1, -1, 3)
+    mask_r, mask_g = hsv_threshold(cv.cvtColor(bgr, cv.COLOR_BGR2HSV), red, green)
+
+    lut = np.full(bgr.shape[1], LABEL_NONE, np.uint8)
+    lut[mask_g.ravel() > 0] = LABEL_GREEN
+    lut[mask_r.ravel() > 0] = LABEL_RED
+    return lut
+
+def load_buoy_lut(bits=LUT_BITS, red=RED_HSV, green=GREEN_HSV, cache_dir=LUT_CACHE_DIR):
+    path = os.path.join(cache_dir, f"buoy_lut_{lut_key(bits, red, green)}.npy")
+    try:
+        lut = np.load(path)
+        if lut.shape == (1 << (3 * bits),) and lut.dtype == np.uint8:
+            return lut
+    except (OSError, ValueError):
+        pass
+
+    lut = build_buoy_lut(bits, red, green)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, lut)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not cache buoy LUT in {cache_dir}: {e}")
+    return lut
+
+# Bounding box plus centroid of one buoy, in full-frame pixels.
+Buoy = namedtuple("Buoy", "x y w h cx cy area")
+
+# Result of one frame: red/green are the biggest Buoy of each colour or None,
+# *_candidates every accepted blob, biggest first. offset is the signed gate
+# centre minus frame centre (only when the boat is lined up between the
+# buoys), distance its magnitude. middle_x is the legacy steering value.
+Detection = namedtuple("Detection", "red green width height middle_x offset distance guidance red_candidates green_candidates",
+                       defaults=((), ()))
+
+MORPH_KERNEL = np.ones((5, 5), np.uint8)
+ERODE_KERNEL = np.ones((17, 17), np.uint8)  # == 4 iterations of the 5x5 kernel
+BUOY_ASPECT_RANGE = (0.25, 4.0)  # accepted blob width / height
+
+DECISIONS = ("KEEP_ROUTE", "TURN_LEFT", "TURN_RIGHT", "TURN_AROUND")
+
+def decide(detection):
+    if detection is None or detection.middle_x is None:
+        return "TURN_AROUND"
+    middle_of_frame = detection.width // 2
+    midpoint = detection.middle_x
+    if abs(midpoint - middle_of_frame) < detection.width * 0.1:
+        return "KEEP_ROUTE"
+    elif midpoint < middle_of_frame:
+        return "TURN_LEFT"
+    else:
+        return "TURN_RIGHT"
+
 class visionNav:
-    def __init__(self, video=None):
+    def __init__(self, video=None, smoothing=DEFAULT_SMOOTHING, classifier="hsv", draw=True, profile=HSV_PROFILE_PATH):
+        if smoothing not in SMOOTHING_MODES:
+            raise ValueError(f"Unknown smoothing mode {smoothing!r}, expected one of {SMOOTHING_MODES}")
+        if classifier not in CLASSIFIERS:
+            raise ValueError(f"Unknown classifier {classifier!r}, expected one of {CLASSIFIERS}")
 
         #inputs
+        if isinstance(video, str):
+            video = open_camera(video)  # a recorded file behaves like the camera
         self.video = video
         self.image = None
+        self.smoothing = smoothing
+        self.classifier = classifier
+        self.draw = draw  # False skips all overlay rendering in detect_buoys
+        self.aspect_range = BUOY_ASPECT_RANGE
+        # HSV ranges: the calibrated profile if one exists, else the built-in defaults
+        self.red_hsv, self.green_hsv = RED_HSV, GREEN_HSV
+        if profile and os.path.exists(profile):
+            self.red_hsv, self.green_hsv = load_hsv_profile(profile)
+            print(f"Loaded HSV profile {profile}")
+
+        self.lut = None
+        if classifier == "lut":
+            levels = 1 << LUT_BITS
+            self.lut = load_buoy_lut(LUT_BITS, self.red_hsv, self.green_hsv).reshape(levels, levels * levels)
+            q = np.arange(256) >> (8 - LUT_BITS)
+            self._lut_coords = np.stack([q, q << LUT_BITS, q], axis=-1).astype(np.int16).reshape(1, 256, 3)
 
         self.hsv_color = None
         self.mask_r = None
@@ -16,6 +154,7 @@ class visionNav:
         self.height = None
         self.width = None
         self.distance = None
+        self.detection = None
 
     def text_size(self, width ,direction):
         font = cv.FONT_HERSHEY_SIMPLEX
@@ -24,112 +163,199 @@ class visionNav:
         text_size = cv.getTextSize(direction, font, scale, thickness)[0]
         cv.putText(self.image, direction, ((width - text_size[0])//2, 50), font, scale, (0, 0, 0), thickness, cv.LINE_AA)
 
+    def prefilter(self, image):
+        # Returns the smoothed frame. The fast modes return it downscaled; the
+        # masks get upscaled back to full size in generate_masks.
+        if self.smoothing == "bilateral":
+            return cv.bilateralFilter(image, 25, 400, 400)
+        if self.smoothing == "bilateral_small":
+            return cv.bilateralFilter(cv.pyrDown(image), 13, 400, 400)
+
+        small = cv.pyrDown(cv.pyrDown(image))
+        if self.smoothing == "pyramid_gaussian":
+            return cv.GaussianBlur(small, (5, 5), 0)
+        return cv.medianBlur(small, 5)
+
+    def threshold(self, hsv):
+        return hsv_threshold(hsv, self.red_hsv, self.green_hsv)
+
+    def classify_lut(self, image):
+        # The table is laid out as a (B, G*R) image and looked up with remap, which
+        # keeps the whole pass inside OpenCV's vectorized code. One lookup per
+        # pixel gives both masks at once.
+        y, x_g, x_r = cv.split(cv.LUT(image, self._lut_coords))
+        coords = cv.merge([cv.add(x_g, x_r), y])
+        labels = cv.remap(self.lut, coords, None, cv.INTER_NEAREST)
+        return cv.compare(labels, LABEL_RED, cv.CMP_EQ), cv.compare(labels, LABEL_GREEN, cv.CMP_EQ)
+
+    def compute_masks(self, image):
+        image_smoothed = self.prefilter(image)
+        if self.classifier == "lut":
+            self.hsv_color = None
+            mask_r, mask_g = self.classify_lut(image_smoothed)
+        else:
+            self.hsv_color = cv.cvtColor(image_smoothed, cv.COLOR_BGR2HSV)
+            mask_r, mask_g = self.threshold(self.hsv_color)
+
+        height, width = image.shape[:2]
+        if image_smoothed.shape[:2] != (height, width):
+            mask_r = cv.resize(mask_r, (width, height), interpolation=cv.INTER_NEAREST)
+            mask_g = cv.resize(mask_g, (width, height), interpolation=cv.INTER_NEAREST)
+
+        # Morphological operations
+        return self.morphops(mask_r), self.morphops(mask_g)
+
     def generate_masks(self):
         if self.image is not None:
-
-            image_bilateral = cv.bilateralFilter(self.image, 25, 400, 400)
-            self.hsv_color = cv.cvtColor(image_bilateral, cv.COLOR_BGR2HSV)
-
-            red = {
-                "lower1": np.array([0, 40, 40]),
-                "upper1": np.array([10, 255, 255]),
-                "lower2": np.array([170, 0, 20]),
-                "upper2": np.array([180, 255, 255])
-            }
-            green = {
-                "lower": np.array([30, 40, 0]),
-                "upper": np.array([90, 255, 255])
-            }
-
-            # green mask
-            self.mask_g = cv.inRange(self.hsv_color, green["lower"], green["upper"])
-            
-            # red mask
-            mask_r1 = cv.inRange(self.hsv_color, red["lower1"], red["upper1"])
-            mask_r2 = cv.inRange(self.hsv_color, red["lower2"], red["upper2"])
-            self.mask_r = mask_r1 | mask_r2
-
-            # Morphological operations
-            self.mask_g = self.morphops(self.mask_g)
-            self.mask_r = self.morphops(self.mask_r)
+            self.mask_r, self.mask_g = self.compute_masks(self.image)
         else:
             print("No image loaded.")
 
     def morphops(self, mask):
-        kernel = np.ones((5,5), np.uint8)
-        mask = cv.morphologyEx(mask, cv.MORPH_OPEN,kernel)
-        mask = cv.erode(mask, kernel, iterations=4)
-        return mask
-
-    def detect(self, mask, min_area, color, description):
-        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        biggest_contour = max(contours, key=cv.contourArea) if contours else None
-        x,y,w,h= cv.boundingRect(biggest_contour)
-        position = x + w // 2
-        box = cv.rectangle(self.image, (x,y), (x+w, y+h), color, 5)
-        cv.putText(self.image, f"{description} BUOY", (x, y - 10), cv.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-        return (True, position, x, y, w, h)
-    
+        # 5x5 opening, then one 17x17 erosion: identical to four 5x5 erosion
+        # iterations (rect kernels compose) in a single pass.
+        mask = cv.morphologyEx(mask, cv.MORPH_OPEN, MORPH_KERNEL)
+        return cv.erode(mask, ERODE_KERNEL)
+
+    def find_candidates(self, mask, min_area):
+        # Every blob of at least min_area pixels with a plausible buoy shape,
+        # biggest first, from a single connected-components pass. Labelling
+        # only the bounding box of the set pixels keeps the cost close to
+        # findContours on the usual mostly-empty mask.
+        x0, y0, w0, h0 = cv.boundingRect(mask)
+        if w0 * h0 < min_area:
+            return []
+        _, _, stats, centroids = cv.connectedComponentsWithStats(mask[y0:y0 + h0, x0:x0 + w0], connectivity=8)
+        # A handful of components per mask: plain Python beats NumPy's per-call overhead here.
+        low, high = self.aspect_range
+        candidates = []
+        for (x, y, w, h, area), (cx, cy) in zip(stats[1:].tolist(), centroids[1:].tolist()):  # label 0 is the background
+            if area < min_area or not low <= w / max(h, 1) <= high:
+                continue
+            candidates.append(Buoy(x + x0, y + y0, w, h, int(round(cx)) + x0, int(round(cy)) + y0, area))
+        candidates.sort(key=lambda buoy: buoy.area, reverse=True)
+        return candidates
+
+    def find_buoy(self, mask, min_area):
+        candidates = self.find_candidates(mask, min_area)
+        return candidates[0] if candidates else None
+
+    def build_detection(self, red, green, width, height, red_candidates=(), green_candidates=()):
+        # Missing buoys count as a zero box, which is what the steering logic
+        # has always been tuned against.
+        x_red, y_red, red_w, red_h = red[:4] if red else (0, 0, 0, 0)
+        x_green, y_green, green_w, green_h = green[:4] if green else (0, 0, 0, 0)
+
+        middle_x = abs((x_green - x_red) // 2)
+        gate_x = ((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2
+        offset = None
+        distance = None
+
+        if x_green - x_red < 0:
+            if green is None:
+                guidance = "Turn Starboard!"
+            else:
+                offset = gate_x - width // 2
+                distance = float(abs(offset))
+                if offset > 0:
+                    guidance = f"Keep Route! Move right: {int(distance)}"
+                elif offset < 0:
+                    guidance = f"Keep Route! Move left: {int(distance)}"
+                else:
+                    guidance = "Keep Route!"
+        elif red is None:
+            guidance = "Turn Port!"
+        else:
+            guidance = "Turn Around!"
+
+        return Detection(red, green, width, height, middle_x, offset, distance, guidance,
+                         tuple(red_candidates), tuple(green_candidates))
+
+    def find_buoys(self, min_area=1000):
+        # Pure detection: one connected-components pass per mask, no pixels touched.
+        height, width = self.image.shape[:2]
+        red = self.find_candidates(self.mask_r, min_area)
+        green = self.find_candidates(self.mask_g, min_area)
+        detection = self.build_detection(red[0] if red else None, green[0] if green else None,
+                                         width, height, red, green)
+        return self.store_detection(detection)
+
+    def store_detection(self, detection):
+        self.detection = detection
+        self.height = detection.height
+        self.width = detection.width
+        self.middle_x = detection.middle_x
+        self.distance = detection.distance
+        return detection
+
     def line_style(self, centerp, p1, p2, color, thickness, description):
         cv.line(self.image, p1, p2, color, thickness)
         cv.circle(self.image, centerp, 5, color, thickness)
         self.text_size(self.width,description)
-    
-    def distance_between(self, x_green, x_red, y_green, y_red, green_w, green_h, red_w, red_h):
-        green_point = ((x_green + (green_w // 2)), (y_green + (green_h // 2)))
-        green_missing = (0,(y_red + (red_h // 2)))
-        red_point = ((x_red + (red_w // 2)), (y_red + (red_h // 2)))
-        red_missing = (self.width, (y_green + (green_h // 2)))
-        distance = x_green - x_red
-        self.middle_x = abs((x_green - x_red) // 2)
-        center_line = (((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2, ((y_green + (green_h // 2)) + (y_red + (red_h // 2))) // 2)
-
-        if distance < 0:
-
-            if x_green == 0 and y_green == 0:
-                self.line_style(green_missing,green_missing,red_point,(0, 255, 0),3,"Turn Starboard!") 
-            
-            else:
-                # Create points correctly with brackets
-                point1 = np.array([((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2, self.height // 2])
-                point2 = np.array([self.width // 2, self.height // 2])
-                self.distance = cv.norm(point1, point2)
-                if (((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2) > self.width // 2:
-                    self.line_style(center_line,green_point, red_point, (0, 255, 255), 3, f"Keep Route! Move right: {int(self.distance)}")
-                elif (((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2) < self.width // 2:
-                    self.line_style(center_line,green_point, red_point, (0, 255, 255), 3, f"Keep Route! Move left: {int(self.distance)}")
-                #line between buoys and center of the frame
-                cv.line(self.image, center_line,(((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2, self.height // 2), (0, 255, 255),2)
-                cv.line(self.image,(((x_green + (green_w // 2)) + (x_red + (red_w // 2))) // 2, self.height // 2),(self.width // 2, self.height // 2), (0, 255, 255),2)
+
+    def annotate(self, detection=None):
+        detection = detection or self.detection
+        if self.image is None or detection is None:
+            return self.image
+        if not self.image.flags.writeable:
+            self.image = self.image.copy()
+
+        for buoy, color, description in ((detection.green, (0, 255, 0), "GREEN"), (detection.red, (0, 0, 255), "RED")):
+            if buoy is not None:
+                cv.rectangle(self.image, (buoy.x, buoy.y), (buoy.x + buoy.w, buoy.y + buoy.h), color, 5)
+                cv.putText(self.image, f"{description} BUOY", (buoy.x, buoy.y - 10), cv.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        red, green = detection.red, detection.green
+        red_point = (red.cx, red.cy) if red else (0, 0)
+        green_point = (green.cx, green.cy) if green else (0, 0)
+        center_line = ((green_point[0] + red_point[0]) // 2, (green_point[1] + red_point[1]) // 2)
+        height, width = detection.height, detection.width
+
+        if detection.guidance == "Turn Starboard!":
+            green_missing = (0, red_point[1])
+            self.line_style(green_missing, green_missing, red_point, (0, 255, 0), 3, detection.guidance)
+        elif detection.guidance == "Turn Port!":
+            red_missing = (width, green_point[1])
+            self.line_style(red_missing, green_point, red_missing, (0, 0, 255), 3, detection.guidance)
+        elif detection.guidance == "Turn Around!":
+            self.line_style(center_line, green_point, red_point, (0, 0, 255), 3, detection.guidance)
         else:
-            if x_red == 0 and y_red == 0:
-                self.line_style(red_missing,green_point,red_missing,(0, 0, 255),3,"Turn Port!")
-            else:
-                self.line_style(center_line,green_point, red_point, (0, 0, 255), 3, f"Turn Around!")
-            
-    def detect_buoys(self, min_area = 1000):
+            if detection.offset:
+                self.line_style(center_line, green_point, red_point, (0, 255, 255), 3, detection.guidance)
+            #line between buoys and center of the frame
+            cv.line(self.image, center_line, (center_line[0], height // 2), (0, 255, 255), 2)
+            cv.line(self.image, (center_line[0], height // 2), (width // 2, height // 2), (0, 255, 255), 2)
+        return self.image
 
-        green_detected, green_position, green_x, green_y, green_w, green_h = self.detect(self.mask_g, min_area, (0, 255, 0),"GREEN") if self.detect(self.mask_g, min_area, (0, 255, 0), "GREEN") else (False, None)
-        red_detected, red_position, red_x, red_y, red_w, red_h = self.detect(self.mask_r, min_area, (0, 0, 255),"RED") if self.detect(self.mask_r, min_area, (0, 0, 255), "RED") else (False, None)
-        
-        height, width, _ = self.image.shape
-        self.height = height
-        self.width = width
+    def detect_buoys(self, min_area = 1000):
+        detection = self.find_buoys(min_area)
+        if self.draw:
+            self.annotate(detection)
+        return detection
 
-        self.distance_between(green_x, red_x, green_y, red_y,green_w, green_h, red_w, red_h)
-        
-        middle_frame = width // 2
-        distance = middle_frame - self.middle_x
-    
-    def run_on_video(self, output_path):
+    def run_on_video(self, output_path, executor=None, show=True):
+        # executor: optional parallel_vision.ParallelVision; frames are then
+        # processed by its workers and written back in order. show=False skips
+        # the preview window (see batch_process.py for fully headless runs).
         width = int(self.video.get(cv.CAP_PROP_FRAME_WIDTH))
         height = int(self.video.get(cv.CAP_PROP_FRAME_HEIGHT))
         fps = self.video.get(cv.CAP_PROP_FPS)
 
-        fourcc = cv.VideoWriter_fourcc(*'mp4v')
-        out = cv.VideoWriter(output_path, fourcc, fps, (width, height))
+        # Encoding runs on the recorder's own thread; see video_recorder.py
+        out = VideoRecorder(output_path, fps=fps or 30.0, fourcc='mp4v', size=(width, height), queue_size=64).start()
+
+        def write(image):
+            out.submit(image, block=True)  # offline: every frame goes into the output file
+            if not show:
+                return True
+            cv.imshow("Processed Frame", image)
+            return not (cv.waitKey(1) & 0xFF == ord('q'))
 
         try:
+            if executor is not None:
+                executor.process_stream(self.video, lambda result: write(result.image), block=True)
+                return output_path
+
             while self.video.isOpened():
                 ret, frame = self.video.read()
                 if not ret:
@@ -137,14 +363,15 @@ class visionNav:
                 self.image = frame
                 self.generate_masks()
                 self.detect_buoys()
-                out.write(self.image)
-                cv.imshow("Processed Frame", self.image)
-                if cv.waitKey(1) & 0xFF == ord('q'):
+                if not write(self.image):
                     break
         
         finally:
             self.video.release()
-            out.release()
-            cv.destroyAllWindows()
+            stats = out.close()
+            if stats["dropped"]:
+                print(f"Recorder dropped {stats['dropped']} frames while encoding {output_path}")
+            if show:
+                cv.destroyAllWindows()
 
-        return output_path
\ No newline at end of file
+        return output_path
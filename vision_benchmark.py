@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+
+import cv2 as cv
+import numpy as np
+
+from vision import visionNav, Buoy, SMOOTHING_MODES, CLASSIFIERS
+
+# Per-stage timing of visionNav on synthetic scenes or recorded footage:
+#   python vision_benchmark.py --out bench.json
+#   python vision_benchmark.py --video run.mp4 --smoothing bilateral_small --out bench.json
+#   python vision_benchmark.py --compare old_bench.json --out new_bench.json
+
+DEFAULT_RESOLUTIONS = ["320x240", "640x480", "1280x720"]
+STAGES = ["prefilter", "hsv", "inrange", "lut", "resize", "morphology", "contours", "drawing"]
+
+
+def synthetic_frame(width, height, red_center, green_center, radius, rng):
+    # Water-ish background with noise and two filled buoys at known positions.
+    frame = np.empty((height, width, 3), np.uint8)
+    frame[:] = (120, 90, 60)
+    frame[: height // 3] = (200, 180, 160)  # sky
+    noise = rng.integers(0, 25, frame.shape, dtype=np.uint8)
+    frame = cv.add(frame, noise)
+
+    truth = {}
+    for name, center, color in (("red", red_center, (30, 30, 210)), ("green", green_center, (40, 190, 30))):
+        if center is None:
+            truth[name] = None
+            continue
+        cv.circle(frame, center, radius, color, -1, cv.LINE_AA)
+        truth[name] = center
+    return frame, truth
+
+
+def synthetic_frames(count, width, height, seed=0):
+    # Gate of two buoys drifting across the frame, occasionally losing one.
+    rng = np.random.default_rng(seed)
+    radius = max(8, width // 18)
+    frames = []
+    for i in range(count):
+        phase = i / max(1, count - 1)
+        cy = int(height * (0.55 + 0.1 * np.sin(phase * 6)))
+        green = (int(width * (0.15 + 0.3 * phase)), cy)
+        red = (int(width * (0.85 - 0.3 * phase)), cy)
+        if i % 25 == 24:
+            red = None
+        frames.append(synthetic_frame(width, height, red, green, radius, rng))
+    return frames
+
+
+def video_frames(path, count, width, height):
+    frames = []
+    video = cv.VideoCapture(path)
+    while len(frames) < count:
+        ret, frame = video.read()
+        if not ret:
+            break
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv.resize(frame, (width, height), interpolation=cv.INTER_AREA)
+        frames.append((frame, None))
+    video.release()
+    return frames
+
+
+def legacy_morphops(mask):
+    # Pre-connected-components path, kept for --legacy-detector comparisons.
+    kernel = np.ones((5, 5), np.uint8)
+    mask = cv.morphologyEx(mask, cv.MORPH_OPEN, kernel)
+    return cv.erode(mask, kernel, iterations=4)
+
+
+def legacy_find_buoys(nav):
+    found = []
+    for mask in (nav.mask_r, nav.mask_g):
+        contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            found.append(None)
+            continue
+        biggest = max(contours, key=cv.contourArea)
+        x, y, w, h = cv.boundingRect(biggest)
+        found.append(Buoy(x, y, w, h, x + w // 2, y + h // 2, int(cv.contourArea(biggest))))
+    height, width = nav.image.shape[:2]
+    return nav.store_detection(nav.build_detection(found[0], found[1], width, height))
+
+
+def time_stages(nav, frame, legacy=False):
+    # Mirrors visionNav.compute_masks + find_buoys + annotate, one timer per stage.
+    times = dict.fromkeys(STAGES, 0.0)
+    clock = time.perf_counter
+
+    t = clock()
+    smoothed = nav.prefilter(frame)
+    times["prefilter"] = clock() - t
+
+    if nav.classifier == "lut":
+        t = clock()
+        mask_r, mask_g = nav.classify_lut(smoothed)
+        times["lut"] = clock() - t
+    else:
+        t = clock()
+        hsv = cv.cvtColor(smoothed, cv.COLOR_BGR2HSV)
+        times["hsv"] = clock() - t
+        t = clock()
+        mask_r, mask_g = nav.threshold(hsv)
+        times["inrange"] = clock() - t
+
+    height, width = frame.shape[:2]
+    if smoothed.shape[:2] != (height, width):
+        t = clock()
+        mask_r = cv.resize(mask_r, (width, height), interpolation=cv.INTER_NEAREST)
+        mask_g = cv.resize(mask_g, (width, height), interpolation=cv.INTER_NEAREST)
+        times["resize"] = clock() - t
+
+    morphops = legacy_morphops if legacy else nav.morphops
+    t = clock()
+    nav.mask_r, nav.mask_g = morphops(mask_r), morphops(mask_g)
+    times["morphology"] = clock() - t
+
+    nav.image = frame.copy()
+    t = clock()
+    detection = legacy_find_buoys(nav) if legacy else nav.find_buoys()
+    times["contours"] = clock() - t
+
+    t = clock()
+    nav.annotate(detection)
+    times["drawing"] = clock() - t
+    return times, detection
+
+
+def percentiles(values):
+    arr = np.asarray(values) * 1000
+    return {
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+    }
+
+
+def hit_rate(detections, truths, tolerance):
+    hits = total = 0
+    for detection, truth in zip(detections, truths):
+        if truth is None:
+            continue
+        for name in ("red", "green"):
+            buoy = getattr(detection, name)
+            total += 1
+            if truth[name] is None:
+                hits += buoy is None
+            elif buoy is not None and abs(buoy.cx - truth[name][0]) <= tolerance and abs(buoy.cy - truth[name][1]) <= tolerance:
+                hits += 1
+    return hits / total if total else None
+
+
+def bench_resolution(nav, frames, warmup=3, legacy=False):
+    for frame, _ in frames[:warmup]:
+        time_stages(nav, frame, legacy)
+
+    per_stage = {stage: [] for stage in STAGES}
+    totals = []
+    detections = []
+    for frame, _ in frames:
+        times, detection = time_stages(nav, frame, legacy)
+        for stage, value in times.items():
+            per_stage[stage].append(value)
+        totals.append(sum(times.values()))
+        detections.append(detection)
+
+    width = frames[0][0].shape[1]
+    total = percentiles(totals)
+    return {
+        "frames": len(frames),
+        "fps": 1000.0 / total["mean_ms"] if total["mean_ms"] else None,
+        "total": total,
+        "stages": {stage: percentiles(values) for stage, values in per_stage.items() if any(values)},
+        "hit_rate": hit_rate(detections, [truth for _, truth in frames], tolerance=max(6, width // 40)),
+    }
+
+
+def git_revision():
+    # The revision of this checkout, wherever the benchmark is run from.
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(resolutions, frames=100, video=None, smoothing="bilateral", classifier="hsv", seed=0, legacy=False):
+    nav = visionNav(smoothing=smoothing, classifier=classifier)
+    report = {
+        "commit": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "opencv": cv.__version__,
+        "source": video or "synthetic",
+        "smoothing": smoothing,
+        "classifier": classifier,
+        "detector": "legacy" if legacy else "components",
+        "results": {},
+    }
+    for resolution in resolutions:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        if video:
+            sample = video_frames(video, frames, width, height)
+        else:
+            sample = synthetic_frames(frames, width, height, seed)
+        if not sample:
+            raise SystemExit(f"No frames read from {video}")
+        report["results"][resolution] = bench_resolution(nav, sample, legacy=legacy)
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"commit {report['commit']}  smoothing={report['smoothing']}  classifier={report['classifier']}  "
+          f"detector={report.get('detector', 'legacy')}  source={report['source']}")
+    for resolution, result in report["results"].items():
+        old = (baseline or {}).get("results", {}).get(resolution)
+        total = result["total"]
+        line = f"\n{resolution}: {result['fps']:.1f} fps  p50 {total['p50_ms']:.1f}  p95 {total['p95_ms']:.1f}  p99 {total['p99_ms']:.1f} ms"
+        if result["hit_rate"] is not None:
+            line += f"  hit rate {result['hit_rate']:.1%}"
+        if old:
+            line += f"  (was {old['fps']:.1f} fps)"
+        print(line)
+        for stage, stats in result["stages"].items():
+            delta = ""
+            if old and stage in old["stages"]:
+                before = old["stages"][stage]["p50_ms"]
+                delta = f"  {stats['p50_ms'] - before:+.2f} ms vs baseline"
+            print(f"  {stage:<11} p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms{delta}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="visionNav per-stage benchmark")
+    parser.add_argument("--video", default=None, help="Recorded footage; synthetic scenes are used if omitted")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS, help="e.g. 640x480")
+    parser.add_argument("--smoothing", default="bilateral", choices=SMOOTHING_MODES)
+    parser.add_argument("--classifier", default="hsv", choices=CLASSIFIERS)
+    parser.add_argument("--legacy-detector", action="store_true", help="Time the old contour detector and 4x erosion instead")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    parser.add_argument("--compare", default=None, help="JSON from an earlier run to diff against")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.resolutions, args.frames, args.video, args.smoothing, args.classifier,
+                           legacy=args.legacy_detector)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n✅ Results saved to {args.out}")
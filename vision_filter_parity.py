@@ -0,0 +1,117 @@
+import argparse
+import time
+
+import cv2 as cv
+import numpy as np
+
+from vision import visionNav, SMOOTHING_MODES
+
+# Compares the fast smoothing modes against the original d=25 bilateral filter
+# on recorded footage:
+#   python vision_filter_parity.py recording.mp4 --max-frames 300
+
+
+def largest_box(mask):
+    contours, _ = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    return cv.boundingRect(max(contours, key=cv.contourArea))
+
+
+def mask_iou(a, b):
+    a = a > 0
+    b = b > 0
+    union = np.count_nonzero(a | b)
+    if union == 0:
+        return 1.0
+    return np.count_nonzero(a & b) / union
+
+
+def boxes_agree(ref, box, tolerance):
+    if ref is None or box is None:
+        return ref is None and box is None
+    ref_cx, ref_cy = ref[0] + ref[2] // 2, ref[1] + ref[3] // 2
+    cx, cy = box[0] + box[2] // 2, box[1] + box[3] // 2
+    return abs(ref_cx - cx) <= tolerance and abs(ref_cy - cy) <= tolerance
+
+
+def timed_masks(nav, frame):
+    nav.image = frame
+    start = time.perf_counter()
+    nav.generate_masks()
+    return time.perf_counter() - start, nav.mask_r, nav.mask_g
+
+
+def run_parity(video_path, modes, max_frames=None, stride=1, tolerance=10):
+    reference = visionNav(smoothing="bilateral")
+    candidates = {mode: visionNav(smoothing=mode) for mode in modes}
+
+    stats = {mode: {"time": [], "iou_r": [], "iou_g": [], "agree": 0} for mode in ["bilateral"] + list(modes)}
+    frames = 0
+
+    video = cv.VideoCapture(video_path)
+    if not video.isOpened():
+        raise IOError(f"Could not open {video_path}")
+
+    index = 0
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, frame = video.read()
+            if not ret:
+                break
+            index += 1
+            if (index - 1) % stride:
+                continue
+            frames += 1
+
+            ref_time, ref_r, ref_g = timed_masks(reference, frame)
+            ref_r, ref_g = ref_r.copy(), ref_g.copy()
+            ref_boxes = (largest_box(ref_r), largest_box(ref_g))
+            stats["bilateral"]["time"].append(ref_time)
+
+            for mode, nav in candidates.items():
+                elapsed, mask_r, mask_g = timed_masks(nav, frame)
+                s = stats[mode]
+                s["time"].append(elapsed)
+                s["iou_r"].append(mask_iou(ref_r, mask_r))
+                s["iou_g"].append(mask_iou(ref_g, mask_g))
+                if boxes_agree(ref_boxes[0], largest_box(mask_r), tolerance) and \
+                        boxes_agree(ref_boxes[1], largest_box(mask_g), tolerance):
+                    s["agree"] += 1
+    finally:
+        video.release()
+
+    report = {}
+    for mode, s in stats.items():
+        if not s["time"]:
+            continue
+        report[mode] = {
+            "frames": frames,
+            "mean_ms": float(np.mean(s["time"]) * 1000),
+            "p95_ms": float(np.percentile(s["time"], 95) * 1000),
+            "iou_red": float(np.mean(s["iou_r"])) if s["iou_r"] else 1.0,
+            "iou_green": float(np.mean(s["iou_g"])) if s["iou_g"] else 1.0,
+            "detection_agreement": s["agree"] / frames if mode != "bilateral" else 1.0,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{'mode':<18}{'mean ms':>9}{'p95 ms':>9}{'IoU red':>9}{'IoU grn':>9}{'agree':>8}")
+    for mode, r in report.items():
+        print(f"{mode:<18}{r['mean_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['iou_red']:>9.3f}"
+              f"{r['iou_green']:>9.3f}{r['detection_agreement']:>8.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smoothing mode parity check against the bilateral filter")
+    parser.add_argument("video", help="Recorded footage (any format OpenCV can read)")
+    parser.add_argument("--modes", nargs="+", default=[m for m in SMOOTHING_MODES if m != "bilateral"],
+                        choices=SMOOTHING_MODES)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--stride", type=int, default=1, help="Use every Nth frame")
+    parser.add_argument("--tolerance", type=int, default=10, help="Max buoy centre shift in pixels to count as agreeing")
+    args = parser.parse_args()
+
+    print_report(run_parity(args.video, [m for m in args.modes if m != "bilateral"],
+                            args.max_frames, args.stride, args.tolerance))
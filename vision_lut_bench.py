@@ -0,0 +1,82 @@
+import argparse
+import time
+
+import cv2 as cv
+import numpy as np
+
+from vision import visionNav, build_buoy_lut, LUT_BITS
+
+# Compares the BGR->label lookup table against cvtColor + inRange:
+#   python vision_lut_bench.py                     (random frames)
+#   python vision_lut_bench.py --video run.mp4     (recorded footage)
+
+
+def load_frames(video_path, count, width, height):
+    if video_path is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+    frames = []
+    video = cv.VideoCapture(video_path)
+    while len(frames) < count:
+        ret, frame = video.read()
+        if not ret:
+            break
+        frames.append(frame)
+    video.release()
+    return frames
+
+
+def time_per_frame(fn, frames, repeat):
+    fn(frames[0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            fn(frame)
+    return (time.perf_counter() - start) / (repeat * len(frames))
+
+
+def run_bench(frames, repeat=3):
+    hsv_nav = visionNav(classifier="hsv")
+    lut_nav = visionNav(classifier="lut")
+
+    def hsv_path(frame):
+        return hsv_nav.threshold(cv.cvtColor(frame, cv.COLOR_BGR2HSV))
+
+    start = time.perf_counter()
+    build_buoy_lut(LUT_BITS)
+    build_time = time.perf_counter() - start
+
+    agree_r = []
+    agree_g = []
+    for frame in frames:
+        ref_r, ref_g = hsv_path(frame)
+        mask_r, mask_g = lut_nav.classify_lut(frame)
+        agree_r.append(np.count_nonzero(ref_r == mask_r) / ref_r.size)
+        agree_g.append(np.count_nonzero(ref_g == mask_g) / ref_g.size)
+
+    return {
+        "frames": len(frames),
+        "lut_bits": LUT_BITS,
+        "lut_build_ms": build_time * 1000,
+        "hsv_ms": time_per_frame(hsv_path, frames, repeat) * 1000,
+        "lut_ms": time_per_frame(lut_nav.classify_lut, frames, repeat) * 1000,
+        "pixel_agreement_red": float(np.mean(agree_r)),
+        "pixel_agreement_green": float(np.mean(agree_g)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LUT classification against HSV thresholding")
+    parser.add_argument("--video", default=None, help="Recorded footage; random frames are used if omitted")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames, args.width, args.height)
+    if not frames:
+        raise SystemExit("No frames to benchmark.")
+    for key, value in run_bench(frames, args.repeat).items():
+        print(f"{key:<24}{value:.4f}" if isinstance(value, float) else f"{key:<24}{value}")